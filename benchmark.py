@@ -0,0 +1,271 @@
+"""Benchmark de las etapas del tablero sobre telemetría sintética.
+
+    python benchmark.py --filas 10000 100000 1000000 --salida benchmarks
+    python benchmark.py --filas 10000000 --datos sinteticos --comparar benchmarks/anterior.json
+
+Por cada tamaño se genera un export sintético (generador_telemetria) y se
+miden, en el mismo orden que las usa el tablero, las etapas de carga,
+productividad, alertas, inicio de labor, recorrido/distancia, mapa de calor
+y PDF. Cada etapa corre una vez con tracemalloc para el pico de memoria y
+`--repeticiones` veces sin él para el tiempo (se guarda el mínimo). La caché
+de gráficos se vacía antes de cada corrida para medir el dibujado. El
+resultado queda en un JSON con la versión del código para comparar entre
+versiones.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+
+from generador_telemetria import FORMAS_RECORRIDO, filas_por_equipo, generar_telemetria
+from graficos import (
+    renderizar, vaciar_cache, dibujar_estados, dibujar_histograma_productividad, dibujar_torta_clasificacion,
+    dibujar_clasificacion_por_grupo
+)
+from procesamiento import (
+    COLUMNAS_BASE, VELOCIDAD_LABOR, IndiceUltimoEstado, ParticionGrupos, leer_telemetria, cargar_telemetria,
+    construir_cubo, productividad_por_equipo, evolucion_horaria, clasificacion_por_grupo, resumen_inactividad,
+    inactividad_por_ventana, evaluar_alertas, agrupar_alertas, resumen_labor, distancia_por_equipo,
+    simplificar_recorrido, detectar_paradas, agregar_por_celda
+)
+from reportes import generar_grafico_ultimo_estado_para_pdf, generar_pdf_reporte
+
+FILAS_POR_DEFECTO = [10_000, 100_000, 1_000_000]
+
+# Avisos de deprecación de seaborn/pandas que ensucian la salida del benchmark
+warnings.filterwarnings('ignore', category=FutureWarning)
+
+
+# ===============================
+# ⏱️ ETAPAS MEDIDAS
+# ===============================
+# Cada etapa recibe el contexto de la corrida y guarda en él lo que usan las siguientes
+def _cargar_datos(ctx):
+    ctx['df'] = leer_telemetria(ctx['ruta'])
+
+
+def _cargar_datos_cache(ctx):
+    cargar_telemetria(ctx['ruta'], columnas=COLUMNAS_BASE, directorio_cache=ctx['cache'])
+
+
+def _cubo(ctx):
+    ctx['cubo'] = construir_cubo(ctx['df'][COLUMNAS_BASE])
+
+
+def _indice_estados(ctx):
+    ctx['indice'] = IndiceUltimoEstado(ctx['df'][COLUMNAS_BASE])
+
+
+def _ultimo_estado(ctx):
+    indice = ctx['indice']
+    resumen = indice.conteo_en(indice.rango[1], ventana=pd.Timedelta(minutes=60), grupos=ctx['grupos'])
+    renderizar(dibujar_estados, resumen.astype({'Grupo Operacion': str}), figsize=(10, 3))
+    indice.linea_tiempo('15min', ventana=pd.Timedelta(minutes=60), grupos=ctx['grupos'])
+
+
+def _productividad(ctx):
+    resumen = productividad_por_equipo(ctx['cubo'])
+    renderizar(dibujar_histograma_productividad, resumen['porcentaje_productivo'], figsize=(10, 3))
+
+
+def _evolucion_horaria(ctx):
+    evolucion_horaria(ctx['cubo'])
+
+
+def _clasificacion(ctx):
+    resumen = productividad_por_equipo(ctx['cubo'])
+    renderizar(dibujar_torta_clasificacion, resumen['clasificacion'].value_counts().sort_index(), figsize=(5, 3))
+    renderizar(dibujar_clasificacion_por_grupo, clasificacion_por_grupo(ctx['cubo'], resumen), figsize=(6, 4))
+
+
+def _alertas(ctx):
+    ctx['alertas'] = evaluar_alertas(resumen_inactividad(ctx['cubo']))
+    ctx['agrupado'] = agrupar_alertas(ctx['alertas'])
+
+
+def _alertas_ventana(ctx):
+    por_ventana = inactividad_por_ventana(ctx['cubo'], 1)
+    evaluar_alertas(por_ventana[por_ventana['Hora'] == por_ventana['Hora'].max()].set_index('Equipo').drop(columns='Hora'))
+
+
+def _particion_gps(ctx):
+    ctx['particion'] = ParticionGrupos(ctx['df'].dropna(subset=['Latitud', 'Longitud']))
+
+
+def _inicio_labor(ctx):
+    ctx['labor'] = resumen_labor(ctx['particion'].vista(ctx['grupos']))
+
+
+def _recorrido_distancia(ctx):
+    vista = ctx['particion'].vista(ctx['grupos'])
+    distancia_por_equipo(vista[vista['Velocidad'] > VELOCIDAD_LABOR], metodo='haversine')
+    distancia_por_equipo(vista[vista['Velocidad'] > VELOCIDAD_LABOR], metodo='elipsoidal')
+    datos_equipo = vista[vista['Equipo'] == vista['Equipo'].iloc[0]]
+    simplificar_recorrido(datos_equipo)
+
+
+def _mapa_calor(ctx):
+    agregar_por_celda(ctx['particion'].vista(ctx['grupos']), estados=['PERDIDA', 'MANTENIMIENTO'])
+
+
+def _paradas(ctx):
+    detectar_paradas(ctx['df'])
+
+
+def _pdf(ctx):
+    buf = generar_grafico_ultimo_estado_para_pdf(ctx['cubo'], ctx['indice'], ctx['grupos'])
+    generar_pdf_reporte(buf, ctx['alertas'][['% alerta total', 'comentario']], ctx['agrupado'], ctx['grupos'])
+
+
+ETAPAS = [
+    ('cargar_datos', _cargar_datos),
+    ('cargar_datos_cache', _cargar_datos_cache),
+    ('cubo', _cubo),
+    ('indice_estados', _indice_estados),
+    ('productividad_ultimo_estado', _ultimo_estado),
+    ('productividad_por_equipo', _productividad),
+    ('productividad_evolucion_horaria', _evolucion_horaria),
+    ('productividad_clasificacion', _clasificacion),
+    ('alertas', _alertas),
+    ('alertas_ventana', _alertas_ventana),
+    ('particion_gps', _particion_gps),
+    ('inicio_labor', _inicio_labor),
+    ('recorrido_distancia', _recorrido_distancia),
+    ('paradas', _paradas),
+    ('mapa_calor', _mapa_calor),
+    ('pdf', _pdf),
+]
+
+
+def _medir(etapa, ctx, repeticiones):
+    vaciar_cache()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    etapa(ctx)
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        vaciar_cache()
+        inicio = time.perf_counter()
+        etapa(ctx)
+        tiempos.append(time.perf_counter() - inicio)
+    return {'segundos': min(tiempos) if tiempos else segundos, 'pico_memoria_mb': pico / 1024 ** 2}
+
+
+def medir_tamano(ruta, directorio_cache, repeticiones=1):
+    """Corre todas las etapas sobre un archivo y devuelve {etapa: {'segundos', 'pico_memoria_mb'}}."""
+    ctx = {'ruta': ruta, 'cache': directorio_cache}
+    # La etapa de caché mide la lectura del Parquet, no su escritura
+    cargar_telemetria(ruta, columnas=['grupo_equipo'], directorio_cache=directorio_cache)
+    resultados = {}
+    for nombre, etapa in ETAPAS:
+        if nombre == 'indice_estados':
+            ctx['grupos'] = sorted(ctx['df']['grupo_equipo'].dropna().unique())
+        resultados[nombre] = _medir(etapa, ctx, repeticiones)
+        print(f"   {nombre:<34} {resultados[nombre]['segundos']:>9.3f} s {resultados[nombre]['pico_memoria_mb']:>9.1f} MB")
+    return resultados
+
+
+# ===============================
+# 📄 RESULTADOS
+# ===============================
+def _version_codigo():
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _comparar(resultados, anterior):
+    """Imprime la razón de tiempos contra un JSON anterior para los tamaños medidos en ambos."""
+    previos = {r['filas_pedidas']: r['etapas'] for r in anterior['resultados']}
+    print(f"\n🔁 Comparación contra {anterior.get('version') or 'JSON anterior'} (actual / anterior)")
+    for resultado in resultados:
+        etapas_previas = previos.get(resultado['filas_pedidas'])
+        if etapas_previas is None:
+            continue
+        print(f"  {resultado['filas_pedidas']:,} filas")
+        for nombre, medida in resultado['etapas'].items():
+            if nombre in etapas_previas and etapas_previas[nombre]['segundos'] > 0:
+                razon = medida['segundos'] / etapas_previas[nombre]['segundos']
+                marca = '🔺' if razon > 1.2 else ('🔻' if razon < 0.8 else '  ')
+                print(f"   {marca} {nombre:<34} x{razon:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide tiempo y pico de memoria de cada etapa del tablero.")
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS_POR_DEFECTO, help="Tamaños a medir (cantidad aproximada de registros)")
+    parser.add_argument('--grupos', type=int, default=4, help="Cantidad de grupos Equipo/Frente")
+    parser.add_argument('--horas', type=float, default=12)
+    parser.add_argument('--intervalo', type=int, default=10, help="Segundos entre registros de un equipo")
+    parser.add_argument('--recorrido', choices=FORMAS_RECORRIDO, default='surcos', help="Forma del recorrido GPS")
+    parser.add_argument('--repeticiones', type=int, default=1, help="Corridas cronometradas por etapa (se guarda la más rápida)")
+    parser.add_argument('--datos', help="Directorio donde guardar y reutilizar los archivos sintéticos (por defecto, uno temporal)")
+    parser.add_argument('--salida', default='benchmarks', help="Directorio del JSON de resultados")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para comparar tiempos")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        datos = args.datos or temporal
+        os.makedirs(datos, exist_ok=True)
+        directorio_cache = os.path.join(temporal, 'cache')
+
+        resultados = []
+        for filas in args.filas:
+            # El tamaño crece con la flota: las horas y el intervalo quedan fijos
+            equipos = max(1, round(filas / filas_por_equipo(args.horas, args.intervalo)))
+            ruta = os.path.join(datos, f"sintetico_{equipos}eq_{args.grupos}g_{args.horas:g}h_{args.intervalo}s_{args.recorrido}.txt")
+            if not os.path.exists(ruta):
+                generar_telemetria(ruta, equipos, args.grupos, args.horas, args.intervalo, args.recorrido)
+            with open(ruta, 'rb') as f:
+                filas_archivo = sum(1 for _ in f) - 1
+            print(f"📏 {filas_archivo:,} registros ({equipos} equipos)")
+            resultados.append({
+                'filas_pedidas': filas, 'filas': filas_archivo, 'equipos': equipos,
+                'etapas': medir_tamano(ruta, directorio_cache, args.repeticiones),
+            })
+
+    informe = {
+        'version': _version_codigo(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+        },
+        'parametros': {
+            'grupos': args.grupos, 'horas': args.horas, 'intervalo_s': args.intervalo,
+            'recorrido': args.recorrido, 'repeticiones': args.repeticiones,
+        },
+        'resultados': resultados,
+    }
+    os.makedirs(args.salida, exist_ok=True)
+    ruta_json = os.path.join(args.salida, f"benchmark_{informe['version'] or 'local'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(ruta_json, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados en {ruta_json}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            _comparar(resultados, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
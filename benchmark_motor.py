@@ -0,0 +1,184 @@
+"""Comparación de los motores fuera de memoria contra la ruta de pandas.
+
+    python benchmark_motor.py --dias 30 --equipos 100 --salida benchmarks
+    python benchmark_motor.py exportes/*.txt --motores duckdb arrow --hilos 8
+
+Convierte los exportes (o un mes sintético, un archivo por día, con
+generador_telemetria) en particiones Parquet por día y corre cada consulta
+de motor_consultas (productividad, evolución horaria, alertas e inicio de
+labor) en dos escenarios: todo el período y un solo grupo en el último día
+(donde se nota la poda de particiones). La ruta de pandas lee los exportes
+originales con leer_telemetria_multiple, arma el cubo y usa las funciones
+del tablero; su carga se informa aparte. Cada resultado de un motor se
+compara con el de pandas (mismos valores, sin tolerancia), lo que valida
+también la escritura de las particiones (solapes y tiempo_seg entre
+archivos), y se guarda el tiempo mínimo de `--repeticiones` corridas.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import pandas as pd
+
+from benchmark import _version_codigo
+from generador_telemetria import generar_telemetria
+from motor_consultas import CONSULTAS, crear_motor, escribir_particiones, motores_disponibles
+from procesamiento import (
+    leer_telemetria_multiple, construir_cubo, filtrar_cubo, productividad_por_equipo, evolucion_horaria,
+    resumen_inactividad, evaluar_alertas, resumen_labor, listar_archivos
+)
+
+warnings.filterwarnings('ignore', category=FutureWarning)
+
+
+# ===============================
+# 🐼 RUTA DE PANDAS (REFERENCIA)
+# ===============================
+def _referencia(nombre, df, cubo, grupos=None, desde=None, hasta=None):
+    if nombre == 'inicio_labor':
+        # Mismo criterio de rango que el cubo: horas completas
+        if grupos is not None:
+            df = df[df['grupo_equipo'].isin(grupos)]
+        if desde is not None:
+            df = df[df['Hora'] >= pd.Timestamp(desde).floor('h')]
+        if hasta is not None:
+            df = df[df['Hora'] <= pd.Timestamp(hasta).floor('h')]
+        return resumen_labor(df)
+    cubo = filtrar_cubo(cubo, grupos, desde, hasta)
+    if nombre == 'productividad':
+        return productividad_por_equipo(cubo)
+    if nombre == 'evolucion_horaria':
+        return evolucion_horaria(cubo)
+    return evaluar_alertas(resumen_inactividad(cubo))
+
+
+def mismos_resultados(a, b):
+    """Mismos valores y columnas; las categóricas se comparan por valor (un motor solo ve las categorías presentes)."""
+    def normalizar(df):
+        df = df.reset_index(drop=df.index.name is None)
+        return df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    try:
+        pd.testing.assert_frame_equal(normalizar(a), normalizar(b), check_exact=True, check_index_type=False)
+        return True
+    except AssertionError:
+        return False
+
+
+def _cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(max(repeticiones, 1)):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, min(tiempos)
+
+
+def _tamano_directorio(directorio):
+    return sum(os.path.getsize(os.path.join(raiz, a)) for raiz, _, archivos in os.walk(directorio) for a in archivos)
+
+
+# ===============================
+# ⏱️ COMPARACIÓN
+# ===============================
+def comparar(archivos, directorio, motores, hilos=None, repeticiones=3):
+    """{'carga_pandas': {...}, 'consultas': [{consulta, escenario, pandas, <motor>, <motor>_igual}]}.
+
+    `directorio` son las particiones escritas a partir de `archivos`; la
+    referencia de pandas se arma con los archivos, no con las particiones.
+    """
+    inicio = time.perf_counter()
+    df = leer_telemetria_multiple(archivos)
+    cubo = construir_cubo(df)
+    carga = {
+        'segundos': time.perf_counter() - inicio,
+        'memoria_mb': (df.memory_usage(deep=True).sum() + cubo.memory_usage(deep=True).sum()) / 1024 ** 2,
+        'particiones_mb': _tamano_directorio(directorio) / 1024 ** 2,
+        'filas': len(df),
+    }
+    print(
+        f"🐼 pandas: {carga['filas']:,} filas de los exportes en memoria ({carga['memoria_mb']:,.0f} MB, particiones {carga['particiones_mb']:,.0f} MB), "
+        f"carga + cubo {carga['segundos']:.1f} s"
+    )
+
+    ultimo_dia = df['Hora'].max().normalize()
+    escenarios = {
+        'todo': {},
+        'grupo_ultimo_dia': {'grupos': [sorted(df['grupo_equipo'].dropna().unique())[0]], 'desde': ultimo_dia, 'hasta': df['Hora'].max()},
+    }
+    instancias = {nombre: crear_motor(directorio, nombre, hilos) for nombre in motores}
+
+    print(f"\n   {'consulta':<18} {'escenario':<17} {'pandas':>9}" + ''.join(f" {m:>9}" for m in motores))
+    filas = []
+    for nombre, consulta in CONSULTAS.items():
+        for escenario, filtros in escenarios.items():
+            esperado, segundos = _cronometrar(lambda: _referencia(nombre, df, cubo, **filtros), repeticiones)
+            fila = {'consulta': nombre, 'escenario': escenario, 'pandas': segundos}
+            for motor, instancia in instancias.items():
+                resultado, fila[motor] = _cronometrar(lambda: consulta(instancia, **filtros), repeticiones)
+                fila[f'{motor}_igual'] = mismos_resultados(resultado, esperado)
+            filas.append(fila)
+            print(f"   {nombre:<18} {escenario:<17} {fila['pandas']:>8.3f}s" + ''.join(
+                f" {fila[m]:>8.3f}s{'' if fila[f'{m}_igual'] else ' ❌'}" for m in motores
+            ))
+    return {'carga_pandas': carga, 'consultas': filas}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara los motores fuera de memoria con pandas en cada consulta.")
+    parser.add_argument('entradas', nargs='*', help="Archivos .txt, patrones glob o directorios con exportes en orden cronológico (por defecto, un período sintético)")
+    parser.add_argument('--dias', type=int, default=30, help="Días del período sintético (un archivo por día)")
+    parser.add_argument('--equipos', type=int, default=100)
+    parser.add_argument('--grupos', type=int, default=4, help="Cantidad de grupos Equipo/Frente")
+    parser.add_argument('--intervalo', type=int, default=10, help="Segundos entre registros de un equipo")
+    parser.add_argument('--motores', nargs='+', default=motores_disponibles(), help="Motores a comparar")
+    parser.add_argument('--hilos', type=int, help="Hilos de los motores (por defecto, todos los CPU)")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Corridas por consulta (se guarda la más rápida)")
+    parser.add_argument('--datos', help="Directorio donde guardar y reutilizar los archivos sintéticos (por defecto, uno temporal)")
+    parser.add_argument('--salida', default='benchmarks', help="Directorio del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        archivos = listar_archivos(args.entradas)
+        if not archivos:
+            datos = args.datos or temporal
+            os.makedirs(datos, exist_ok=True)
+            inicio = pd.Timestamp('2024-03-01')
+            for dia in range(args.dias):
+                ruta = os.path.join(datos, f"sintetico_{args.equipos}eq_{args.grupos}g_{args.intervalo}s_dia{dia:03d}.txt")
+                if not os.path.exists(ruta):
+                    generar_telemetria(ruta, args.equipos, args.grupos, 24, args.intervalo, inicio=str(inicio + pd.Timedelta(days=dia)), semilla=dia)
+                archivos.append(ruta)
+
+        directorio = os.path.join(temporal, 'particiones')
+        inicio = time.perf_counter()
+        escritura = escribir_particiones(archivos, directorio)
+        escritura['segundos'] = time.perf_counter() - inicio
+        print(f"🗂️ {len(archivos)} archivos → {escritura['filas']:,} filas particionadas en {escritura['segundos']:.1f} s")
+        resultado = comparar(archivos, directorio, args.motores, args.hilos, args.repeticiones)
+
+    informe = {
+        'version': _version_codigo(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {'python': platform.python_version(), 'pandas': pd.__version__, 'cpus': os.cpu_count()},
+        'parametros': {'archivos': len(archivos), 'motores': args.motores, 'hilos': args.hilos, 'repeticiones': args.repeticiones},
+        'particiones': escritura,
+        **resultado,
+    }
+    os.makedirs(args.salida, exist_ok=True)
+    ruta_json = os.path.join(args.salida, f"motor_{informe['version'] or 'local'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(ruta_json, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados en {ruta_json}")
+    distintos = [f"{f['consulta']}/{f['escenario']}/{m}" for f in resultado['consultas'] for m in args.motores if not f[f'{m}_igual']]
+    if distintos:
+        print(f"❌ Resultados distintos de pandas: {', '.join(distintos)}")
+    return 1 if distintos else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
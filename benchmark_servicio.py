@@ -0,0 +1,140 @@
+"""Latencia del servicio de agregados con clientes concurrentes.
+
+    python benchmark_servicio.py --filas 1000000 --clientes 1 4 16 --repeticiones 5
+    python benchmark_servicio.py exportes/semana.txt --clientes 8
+
+Levanta servicio_agregados en un puerto libre del mismo proceso y arma el
+conjunto de consultas del tablero (cada consulta × formato × todos los grupos
+y cada grupo por separado, con y sin rango horario). Por cada cantidad de
+clientes se mide:
+
+- en frío: la caché de respuestas vacía y cada consulta pedida una vez, así
+  que todas se calculan;
+- en caliente: el mismo conjunto repetido `--repeticiones` veces, servido
+  desde la caché.
+
+Se informan p50, p95, p99 y máximo de la latencia por petición y las
+peticiones por segundo. Sin archivo se genera uno sintético
+(generador_telemetria) con la cantidad de filas pedida.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+from benchmark import _version_codigo
+from cache_datos import vaciar_cache
+from generador_telemetria import filas_por_equipo, generar_telemetria
+from servicio_agregados import CONSULTAS, FORMATOS, ServicioAgregados, crear_servidor
+
+CLIENTES_POR_DEFECTO = [1, 4, 16]
+
+
+def armar_consultas(servicio):
+    """Rutas de todas las combinaciones consulta × formato × grupos × rango."""
+    primero, ultimo = servicio.indice.rango
+    rangos = [{}, {'desde': (primero + (ultimo - primero) / 2).isoformat(), 'hasta': ultimo.isoformat()}]
+    selecciones = [[]] + [[grupo] for grupo in servicio.grupos]
+    rutas = []
+    for nombre in CONSULTAS:
+        for formato in FORMATOS:
+            for grupos in selecciones:
+                for rango in rangos:
+                    parametros = [('formato', formato)] + [('grupo', g) for g in grupos] + list(rango.items())
+                    rutas.append(f"/{nombre}?{urlencode(parametros)}")
+    return rutas
+
+
+def _pedir(base, ruta):
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(base + ruta) as respuesta:
+        respuesta.read()
+    return time.perf_counter() - inicio
+
+
+def _ronda(base, rutas, clientes):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clientes) as pool:
+        latencias = np.array(list(pool.map(lambda ruta: _pedir(base, ruta), rutas)))
+    segundos = time.perf_counter() - inicio
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) * 1000
+    return {
+        'peticiones': len(rutas), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+        'max_ms': latencias.max() * 1000, 'peticiones_por_segundo': len(rutas) / segundos,
+    }
+
+
+def medir(servicio, niveles_clientes, repeticiones):
+    """{clientes: {'frio': {...}, 'caliente': {...}}} con el servidor escuchando en un hilo."""
+    servidor = crear_servidor(servicio, puerto=0, registrar=False)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    rutas = armar_consultas(servicio)
+    print(f"🔗 {len(rutas)} consultas distintas")
+
+    resultados = {}
+    try:
+        for clientes in niveles_clientes:
+            vaciar_cache()
+            frio = _ronda(base, rutas, clientes)
+            caliente = _ronda(base, rutas * repeticiones, clientes)
+            resultados[clientes] = {'frio': frio, 'caliente': caliente}
+            for fase, r in (('frío', frio), ('caliente', caliente)):
+                print(
+                    f"   {clientes:>3} clientes {fase:<9} p50 {r['p50_ms']:>8.1f} ms  p95 {r['p95_ms']:>8.1f} ms  "
+                    f"p99 {r['p99_ms']:>8.1f} ms  máx {r['max_ms']:>8.1f} ms  {r['peticiones_por_segundo']:>8.1f} pet/s"
+                )
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide la latencia del servicio de agregados con clientes concurrentes.")
+    parser.add_argument('entradas', nargs='*', help="Archivos de telemetría (por defecto se genera uno sintético)")
+    parser.add_argument('--filas', type=int, default=1_000_000, help="Registros del archivo sintético")
+    parser.add_argument('--clientes', type=int, nargs='+', default=CLIENTES_POR_DEFECTO, help="Cantidades de clientes concurrentes")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Veces que se repite el conjunto de consultas en caliente")
+    parser.add_argument('--salida', default='benchmarks', help="Directorio del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        archivos = [os.path.abspath(a) for a in args.entradas]
+        if not archivos:
+            equipos = max(1, round(args.filas / filas_por_equipo(12, 10)))
+            archivos = [os.path.join(temporal, 'sintetico.txt')]
+            generar_telemetria(archivos[0], equipos)
+        servicio = ServicioAgregados(archivos, directorio_cache=os.path.join(temporal, 'cache'))
+        print(f"📏 {servicio.filas:,} registros, {len(servicio.grupos)} grupos, carga {servicio.segundos_carga:.1f} s")
+        resultados = medir(servicio, args.clientes, args.repeticiones)
+
+    informe = {
+        'version': _version_codigo(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {'python': platform.python_version(), 'pandas': pd.__version__, 'cpus': os.cpu_count()},
+        'filas': servicio.filas,
+        'repeticiones': args.repeticiones,
+        'resultados': resultados,
+    }
+    os.makedirs(args.salida, exist_ok=True)
+    ruta_json = os.path.join(args.salida, f"servicio_{informe['version'] or 'local'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(ruta_json, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados en {ruta_json}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
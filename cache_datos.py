@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# 🗄️ CACHÉ DE DATOS COMPARTIDA CON PRESUPUESTO DE MEMORIA
+# ===============================
+# Frames cargados y agregados derivados, compartidos por todas las sesiones del
+# proceso. La clave la arma quien llama (huella del contenido + parámetros), así
+# que dos supervisores que suben el mismo archivo usan la misma entrada. Las
+# entradas se desalojan por LRU cuando la suma de sus tamaños supera el
+# presupuesto. Los objetos se entregan sin copiar: los DataFrame como copia
+# superficial (con copy-on-write los datos se comparten y una escritura de la
+# sesión no toca la entrada); el resto tal cual, y se tratan como de solo lectura.
+MAX_BYTES_DATOS = int(float(os.environ.get('MONITOREO_CACHE_DATOS_MB', 2048)) * 1024 ** 2)
+
+_cache = OrderedDict()  # clave -> (valor, bytes)
+_bytes_cache = 0
+_estadisticas = {'aciertos': 0, 'fallos': 0, 'desalojos': 0, 'rechazos': 0}
+_candado = threading.Lock()
+# Un candado por clave en cálculo: si dos sesiones piden lo mismo a la vez, una calcula y la otra espera
+_en_curso = {}
+
+
+def tamano_objeto(valor, profundidad=2):
+    """Bytes aproximados de un frame, arreglo o de los atributos de un objeto (p. ej. IndiceUltimoEstado)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if profundidad and isinstance(valor, dict):
+        return sum(tamano_objeto(v, profundidad - 1) for v in valor.values())
+    if profundidad and isinstance(valor, (list, tuple)):
+        return sum(tamano_objeto(v, profundidad - 1) for v in valor)
+    if profundidad and hasattr(valor, '__dict__'):
+        return sum(tamano_objeto(v, profundidad - 1) for v in vars(valor).values())
+    return sys.getsizeof(valor)
+
+
+def _entregar(valor):
+    return valor.copy(deep=False) if isinstance(valor, pd.DataFrame) else valor
+
+
+def _desalojar():
+    global _bytes_cache
+    while _cache and _bytes_cache > MAX_BYTES_DATOS:
+        _, (_, tamano) = _cache.popitem(last=False)
+        _bytes_cache -= tamano
+        _estadisticas['desalojos'] += 1
+
+
+def obtener(clave, calcular):
+    """Valor guardado bajo `clave` o, si no está, el resultado de `calcular()` (que queda guardado si entra en el presupuesto)."""
+    global _bytes_cache
+    with _candado:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            _estadisticas['aciertos'] += 1
+            return _entregar(_cache[clave][0])
+        candado_clave = _en_curso.setdefault(clave, threading.Lock())
+
+    with candado_clave:
+        with _candado:
+            if clave in _cache:
+                _cache.move_to_end(clave)
+                _estadisticas['aciertos'] += 1
+                return _entregar(_cache[clave][0])
+            _estadisticas['fallos'] += 1
+        try:
+            valor = calcular()
+            tamano = tamano_objeto(valor)
+            with _candado:
+                if tamano > MAX_BYTES_DATOS:
+                    # Más grande que todo el presupuesto: se entrega sin guardar
+                    _estadisticas['rechazos'] += 1
+                else:
+                    _cache[clave] = (valor, tamano)
+                    _bytes_cache += tamano
+                    _desalojar()
+        finally:
+            with _candado:
+                _en_curso.pop(clave, None)
+    return _entregar(valor)
+
+
+def estadisticas_cache():
+    with _candado:
+        return dict(_estadisticas, entradas=len(_cache), bytes=_bytes_cache, presupuesto=MAX_BYTES_DATOS)
+
+
+def detalle_cache():
+    """Entradas de la más reciente a la más antigua, con su tipo y tamaño en MB."""
+    with _candado:
+        return pd.DataFrame(
+            [(clave[0], type(valor).__name__, tamano / 1024 ** 2) for clave, (valor, tamano) in reversed(_cache.items())],
+            columns=['Tipo', 'Objeto', 'MB']
+        )
+
+
+def vaciar_cache():
+    global _bytes_cache
+    with _candado:
+        _cache.clear()
+        _bytes_cache = 0
@@ -0,0 +1,116 @@
+"""Generador de telemetría sintética con el formato del export (separado por ';').
+
+    python generador_telemetria.py sintetico.txt --equipos 200 --grupos 4 --horas 12 --intervalo 10 --recorrido surcos
+
+Cada equipo alterna tramos de estados de operación (algunos equipos quedan
+completamente parados o en mantenimiento para que aparezcan alertas) y su
+velocidad y recorrido GPS dependen del estado. El archivo se escribe por
+lotes de equipos, ordenado por Fecha/Hora dentro de cada lote, así que la
+memoria no crece con la cantidad de filas.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from procesamiento import FORMATO_FECHA
+
+FORMAS_RECORRIDO = ('surcos', 'circular', 'aleatorio')
+ESTADOS = np.array(['PRODUCTIVO', 'PERDIDA', 'MANTENIMIENTO', 'AUXILIAR', 'NAO CADASTRADO'])
+PROBABILIDADES_ESTADO = [0.6, 0.2, 0.1, 0.05, 0.05]
+# Cantidad de registros seguidos con el mismo estado
+REGISTROS_POR_TRAMO = 60
+EQUIPOS_POR_LOTE = 100
+# Metros por grado de latitud
+METROS_POR_GRADO = 111_320.0
+
+
+def filas_por_equipo(horas, intervalo_s):
+    return int(horas * 3600 / intervalo_s)
+
+
+def _recorrido(forma, distancia, rng):
+    """Posición (x, y) en metros a partir de la distancia acumulada recorrida."""
+    if forma == 'surcos':
+        largo, separacion = 400.0, 10.0
+        surco = distancia // largo
+        avance = distancia % largo
+        x = np.where(surco % 2 == 0, avance, largo - avance)
+        y = surco * separacion
+    elif forma == 'circular':
+        radio = 200.0
+        angulo = distancia / radio
+        x, y = radio * np.cos(angulo), radio * np.sin(angulo)
+    else:
+        rumbo = np.cumsum(rng.normal(0, 0.3, len(distancia)))
+        paso = np.diff(distancia, prepend=0.0)
+        x, y = np.cumsum(paso * np.cos(rumbo)), np.cumsum(paso * np.sin(rumbo))
+    return x + rng.normal(0, 1.5, len(distancia)), y + rng.normal(0, 1.5, len(distancia))
+
+
+def _equipo(numero, grupos, n, intervalo_s, forma, rng):
+    segundos = np.arange(n) * intervalo_s + rng.integers(0, min(3, intervalo_s), n)
+
+    # Los primeros equipos de cada 50 quedan 100% en mantenimiento, 100% parados o mayormente parados
+    probabilidades = {0: [0, 0, 1, 0, 0], 1: [0, 1, 0, 0, 0], 2: [0.1, 0.5, 0.3, 0.05, 0.05]}.get(numero % 50, PROBABILIDADES_ESTADO)
+    tramos = rng.choice(len(ESTADOS), n // REGISTROS_POR_TRAMO + 1, p=probabilidades)
+    estados = np.repeat(tramos, REGISTROS_POR_TRAMO)[:n]
+    productivo = np.isin(ESTADOS[estados], ['PRODUCTIVO', 'AUXILIAR'])
+    velocidad = np.where(productivo, rng.uniform(5, 20, n), rng.uniform(0, 2, n))
+
+    distancia = np.cumsum(velocidad / 3.6 * intervalo_s)
+    x, y = _recorrido(forma, distancia, rng)
+    grupo = numero % grupos
+    lat0 = 4.5 + 0.02 * grupo + rng.uniform(-0.005, 0.005)
+    lon0 = -75.6 + 0.02 * grupo + rng.uniform(-0.005, 0.005)
+    return {
+        'segundos': segundos,
+        'Equipo': np.full(n, f'{1000 + numero}'),
+        'Grupo Operacion': ESTADOS[estados],
+        'Grupo Equipo/Frente': np.full(n, f'FRENTE {grupo}'),
+        'Latitud': np.round(lat0 + y / METROS_POR_GRADO, 6),
+        'Longitud': np.round(lon0 + x / (METROS_POR_GRADO * np.cos(np.radians(lat0))), 6),
+        'Velocidad': np.round(velocidad, 1),
+    }
+
+
+def generar_telemetria(ruta, equipos=20, grupos=4, horas=12, intervalo_s=10, recorrido='surcos',
+                       inicio='2024-03-05 06:00:00', semilla=0):
+    """Escribe el archivo sintético y devuelve la cantidad de filas escritas."""
+    if recorrido not in FORMAS_RECORRIDO:
+        raise ValueError(f"Forma de recorrido desconocida: {recorrido} (opciones: {', '.join(FORMAS_RECORRIDO)})")
+    rng = np.random.default_rng(semilla)
+    n = filas_por_equipo(horas, intervalo_s)
+    # Texto de cada segundo del período, formateado una sola vez
+    textos = pd.date_range(inicio, periods=n * intervalo_s + 3, freq='s').strftime(FORMATO_FECHA).to_numpy()
+
+    escritas = 0
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        for primero in range(0, equipos, EQUIPOS_POR_LOTE):
+            partes = [_equipo(numero, grupos, n, intervalo_s, recorrido, rng) for numero in range(primero, min(primero + EQUIPOS_POR_LOTE, equipos))]
+            lote = pd.DataFrame({col: np.concatenate([p[col] for p in partes]) for col in partes[0]})
+            lote = lote.sort_values('segundos', kind='stable')
+            lote.insert(0, 'Fecha/Hora', textos[lote.pop('segundos').to_numpy()])
+            lote.to_csv(f, sep=';', index=False, header=primero == 0, lineterminator='\n')
+            escritas += len(lote)
+    return escritas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un export de telemetría sintético.")
+    parser.add_argument('ruta', help="Archivo .txt de salida")
+    parser.add_argument('--equipos', type=int, default=20)
+    parser.add_argument('--grupos', type=int, default=4, help="Cantidad de grupos Equipo/Frente")
+    parser.add_argument('--horas', type=float, default=12)
+    parser.add_argument('--intervalo', type=int, default=10, help="Segundos entre registros de un equipo")
+    parser.add_argument('--recorrido', choices=FORMAS_RECORRIDO, default='surcos', help="Forma del recorrido GPS")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    filas = generar_telemetria(args.ruta, args.equipos, args.grupos, args.horas, args.intervalo, args.recorrido, semilla=args.semilla)
+    print(f"✅ {args.ruta}: {filas:,} registros")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+# ===============================
+# 🖼️ RENDERIZADO DE GRÁFICOS CON CACHÉ LRU
+# ===============================
+# Las figuras se dibujan sobre matplotlib.figure.Figure (sin pyplot), se
+# convierten a bytes PNG/SVG y se liberan enseguida. Los bytes quedan en una
+# caché LRU acotada, compartida por todas las sesiones del proceso, cuya
+# clave es el hash de los datos agregados más los parámetros del gráfico.
+MAX_ENTRADAS_CACHE = 256
+MAX_BYTES_CACHE = 64 * 1024 ** 2
+
+COLORES_ESTADO = {
+    'MANTENIMIENTO': 'blue',
+    'PERDIDA': 'red',
+    'PRODUCTIVO': 'green',
+    'NAO CADASTRADO': 'grey'
+}
+COLORES_CLASIFICACION = ['#ef5350', '#ffa726', '#66bb6a']
+
+_cache = OrderedDict()
+_bytes_cache = 0
+_estadisticas = {'aciertos': 0, 'fallos': 0, 'desalojos': 0}
+_candado = threading.Lock()
+
+
+def _huella_datos(datos):
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(datos, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(datos, index=True).to_numpy().tobytes())
+        columnas = datos.columns if isinstance(datos, pd.DataFrame) else [datos.name]
+        h.update(repr(list(columnas)).encode())
+    else:
+        h.update(repr(datos).encode())
+    return h.hexdigest()
+
+
+def renderizar(dibujar, datos, formato='png', figsize=(10, 3), dpi=200, **parametros):
+    """Bytes del gráfico que produce `dibujar(fig, datos, **parametros)`, desde la caché si ya se dibujó."""
+    global _bytes_cache
+    clave = (dibujar.__name__, _huella_datos(datos), formato, figsize, dpi, repr(sorted(parametros.items())))
+    with _candado:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            _estadisticas['aciertos'] += 1
+            return _cache[clave]
+        _estadisticas['fallos'] += 1
+
+    fig = Figure(figsize=figsize)
+    try:
+        dibujar(fig, datos, **parametros)
+        buf = io.BytesIO()
+        fig.savefig(buf, format=formato, dpi=dpi, bbox_inches='tight')
+        contenido = buf.getvalue()
+    finally:
+        fig.clear()
+        del fig
+
+    with _candado:
+        if clave not in _cache:
+            _cache[clave] = contenido
+            _bytes_cache += len(contenido)
+        while _cache and (len(_cache) > MAX_ENTRADAS_CACHE or _bytes_cache > MAX_BYTES_CACHE):
+            _, desalojado = _cache.popitem(last=False)
+            _bytes_cache -= len(desalojado)
+            _estadisticas['desalojos'] += 1
+    return contenido
+
+
+def estadisticas_cache():
+    with _candado:
+        return dict(_estadisticas, entradas=len(_cache), bytes=_bytes_cache)
+
+
+def vaciar_cache():
+    """Descarta los gráficos guardados (p. ej. para medir el dibujado en el benchmark)."""
+    global _bytes_cache
+    with _candado:
+        _cache.clear()
+        _bytes_cache = 0
+
+
+# ===============================
+# 🎨 FUNCIONES DE DIBUJO
+# ===============================
+def dibujar_estados(fig, resumen, titulo="Equipos por Estado Operativo"):
+    ax = fig.subplots()
+    sns.barplot(data=resumen, x='Grupo Operacion', y='Cantidad', palette=COLORES_ESTADO, ax=ax)
+    ax.set_title(titulo)
+    ax.set_ylim(0, resumen['Cantidad'].max() * 1.2)
+    for container in ax.containers:
+        ax.bar_label(container, label_type='edge', padding=3)
+
+
+def dibujar_histograma_productividad(fig, porcentajes):
+    ax = fig.subplots()
+    ax.hist(porcentajes, bins=10, color='#4fc3f7', edgecolor='black')
+    ax.set_title('Distribución de Productividad (%)')
+    ax.set_xlabel('% Productivo')
+    ax.set_ylabel('Cantidad de Equipos')
+
+
+def dibujar_torta_clasificacion(fig, conteos):
+    ax = fig.subplots()
+    ax.pie(conteos, labels=conteos.index, autopct='%1.1f%%', colors=COLORES_CLASIFICACION, startangle=90)
+    ax.axis('equal')
+
+
+def dibujar_clasificacion_por_grupo(fig, tabla_pivot):
+    ax = fig.subplots()
+    tabla_pivot.plot(kind='bar', stacked=True, color=COLORES_CLASIFICACION, ax=ax)
+    ax.set_ylabel('Porcentaje Productivo (%)')
+    ax.set_title('Clasificación por Grupo de Equipo')
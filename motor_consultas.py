@@ -0,0 +1,314 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from procesamiento import (
+    TAMANO_BLOQUE, VELOCIDAD_LABOR, CLAVES_LABOR, COLUMNAS_CATEGORICAS, _leer_crudo, _concatenar_bloques,
+    _completar_telemetria, armar_resumen_labor, productividad_por_equipo, evolucion_horaria, resumen_inactividad,
+    evaluar_alertas
+)
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# ===============================
+# 🗂️ PARTICIONES PARQUET POR DÍA
+# ===============================
+# Esquema fijo de las particiones: los archivos sin GPS escriben esas columnas como nulas
+ESQUEMA_PARTICION = pa.schema([
+    ('Fecha/Hora', pa.timestamp('ns')),
+    ('Equipo', pa.string()),
+    ('Grupo Operacion', pa.string()),
+    ('grupo_equipo', pa.string()),
+    ('Hora', pa.timestamp('ns')),
+    ('tiempo_seg', pa.float64()),
+    ('Latitud', pa.float32()),
+    ('Longitud', pa.float32()),
+    ('Velocidad', pa.float32()),
+])
+PARTICIONADO = ds.partitioning(pa.schema([('dia', pa.string())]), flavor='hive')
+
+
+def _tabla_particion(df):
+    columnas = []
+    for campo in ESQUEMA_PARTICION:
+        if campo.name in df.columns:
+            valores = df[campo.name]
+            if isinstance(valores.dtype, pd.CategoricalDtype):
+                valores = valores.astype(object)
+            columnas.append(pa.array(valores, type=campo.type, from_pandas=True))
+        else:
+            columnas.append(pa.nulls(len(df), campo.type))
+    codigos, dias = pd.factorize(df['Fecha/Hora'].dt.normalize())
+    columnas.append(pa.array(np.asarray(dias.strftime('%Y-%m-%d'), dtype=object)[codigos], type=pa.string()))
+    return pa.Table.from_arrays(columnas, schema=ESQUEMA_PARTICION.append(pa.field('dia', pa.string())))
+
+
+def escribir_particiones(archivos, directorio, tamano_bloque=TAMANO_BLOQUE):
+    """Convierte exportes de telemetría en un directorio Parquet particionado por día (dia=AAAA-MM-DD).
+
+    Los archivos se procesan de a uno, en el orden dado (deben ser tramos
+    consecutivos de tiempo): el último registro de cada equipo se retiene y
+    se une al archivo siguiente, así tiempo_seg cruza archivos igual que en
+    leer_telemetria_multiple sin cargar todo el período en memoria. De cada
+    equipo se guarda el último instante ya visto y se descartan los registros
+    de archivos siguientes en o antes de ese instante (exportes solapados),
+    además de los repetidos (Equipo, Fecha/Hora) dentro de un archivo.
+    Devuelve las filas escritas y los duplicados descartados.
+    """
+    if os.path.isdir(directorio) and os.listdir(directorio):
+        raise FileExistsError(f"El directorio de particiones no está vacío: {directorio}")
+    os.makedirs(directorio, exist_ok=True)
+
+    pendientes = None
+    vistos = pd.Series(dtype='datetime64[ns]')
+    filas = duplicados = 0
+    for parte, archivo in enumerate(archivos):
+        df = _leer_crudo(archivo, tamano_bloque)
+        if not vistos.empty:
+            # Un exporte solapado repite el tramo final del anterior: ese tramo ya se escribió (o está pendiente)
+            limite = df['Equipo'].astype(object).map(vistos)
+            cubiertos = (df['Fecha/Hora'] <= limite).to_numpy()
+            duplicados += int(cubiertos.sum())
+            df = df[~cubiertos]
+        if not df.empty:
+            maximos = df.groupby(df['Equipo'].astype(object))['Fecha/Hora'].max()
+            vistos = pd.concat([vistos, maximos]).groupby(level=0).max() if not vistos.empty else maximos
+        if pendientes is not None:
+            df = _concatenar_bloques([pendientes.drop(columns=['Hora', 'tiempo_seg']), df])
+        antes = len(df)
+        df = df.drop_duplicates(subset=['Equipo', 'Fecha/Hora'], ignore_index=True)
+        duplicados += antes - len(df)
+        if df.empty:
+            continue
+        df = _completar_telemetria(df)
+
+        if parte < len(archivos) - 1:
+            # El último registro de cada equipo espera al siguiente archivo para conocer su tiempo_seg
+            ultimos = ~df['Equipo'].duplicated(keep='last').to_numpy()
+            pendientes, df = df[ultimos], df[~ultimos]
+        pq.write_to_dataset(
+            _tabla_particion(df), directorio, partitioning=PARTICIONADO,
+            basename_template=f"parte-{parte:05d}-{{i}}.parquet", existing_data_behavior='overwrite_or_ignore'
+        )
+        filas += len(df)
+    return {'filas': filas, 'duplicados': duplicados}
+
+
+def abrir_particiones(directorio):
+    esquema = ESQUEMA_PARTICION.append(pa.field('dia', pa.string()))
+    return ds.dataset(directorio, format='parquet', schema=esquema, partitioning=PARTICIONADO)
+
+
+def leer_particiones(directorio, columnas=None):
+    """Todo el directorio en memoria con el esquema de leer_telemetria (mismas filas que leer_telemetria_multiple)."""
+    df = abrir_particiones(directorio).to_table(columns=columnas).to_pandas()
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in ['Latitud', 'Longitud', 'Velocidad']:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+    df = df.sort_values(['Equipo', 'Fecha/Hora'], ignore_index=True)
+    return df.dropna(axis=1, how='all')
+
+
+def _categorizar(df):
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype(object).astype('category')
+    for col in ['Fecha/Hora', 'Hora']:
+        if col in df.columns:
+            df[col] = df[col].astype('datetime64[ns]')
+    return df
+
+
+# ===============================
+# 🦆 MOTORES FUERA DE MEMORIA
+# ===============================
+# Cada motor resuelve dos primitivas sobre las particiones sin cargarlas enteras:
+#   sumar_tiempo(claves, ...)  -> tiempo_seg sumado por claves (un cubo reducido)
+#   labor(...)                 -> pares (grupo_equipo, Equipo), primer y último registro de labor
+# Las consultas de abajo aplican encima las mismas funciones de pandas que el tablero,
+# así que los porcentajes, clasificaciones y reglas de alerta son idénticos.
+# El rango desde/hasta se aplica por horas completas, igual que filtrar_cubo.
+def _rango(desde, hasta):
+    return (
+        None if desde is None else pd.Timestamp(desde).floor('h'),
+        None if hasta is None else pd.Timestamp(hasta).floor('h'),
+    )
+
+
+class MotorDuckDB:
+    """Consultas SQL de DuckDB sobre los Parquet (multihilo, con poda de particiones y derrame a disco)."""
+    nombre = 'duckdb'
+
+    def __init__(self, directorio, hilos=None, memoria=None):
+        if duckdb is None:
+            raise ImportError("El motor 'duckdb' requiere el paquete duckdb (pip install duckdb)")
+        self.conexion = duckdb.connect()
+        self.conexion.execute(f"SET threads = {int(hilos or os.cpu_count())}")
+        if memoria:
+            self.conexion.execute(f"SET memory_limit = '{memoria}'")
+        patron = os.path.join(directorio, '**', '*.parquet').replace("'", "''")
+        self._origen = f"read_parquet('{patron}', hive_partitioning = true, hive_types = {{'dia': VARCHAR}})"
+
+    def _consultar(self, sql, parametros):
+        # Un cursor por consulta: la conexión no se comparte entre hilos
+        with self.conexion.cursor() as cursor:
+            return cursor.execute(sql, parametros).df()
+
+    def _filtro(self, grupos, desde, hasta, con_grupo=True):
+        condiciones, parametros = ['grupo_equipo IS NOT NULL'] if con_grupo else ['TRUE'], []
+        if grupos is not None:
+            condiciones.append('list_contains(?, grupo_equipo)')
+            parametros.append([str(g) for g in grupos])
+        desde, hasta = _rango(desde, hasta)
+        if desde is not None:
+            condiciones += ['dia >= ?', '"Hora" >= ?']
+            parametros += [desde.strftime('%Y-%m-%d'), desde.to_pydatetime()]
+        if hasta is not None:
+            condiciones += ['dia <= ?', '"Hora" <= ?']
+            parametros += [hasta.strftime('%Y-%m-%d'), hasta.to_pydatetime()]
+        return ' AND '.join(condiciones), parametros
+
+    def sumar_tiempo(self, claves, grupos=None, desde=None, hasta=None):
+        columnas = ', '.join(f'"{c}"' for c in claves)
+        filtro, parametros = self._filtro(grupos, desde, hasta)
+        sql = f'SELECT {columnas}, SUM(tiempo_seg) AS tiempo_seg FROM {self._origen} WHERE {filtro} GROUP BY {columnas}'
+        return _categorizar(self._consultar(sql, parametros))
+
+    def labor(self, grupos=None, desde=None, hasta=None):
+        filtro, parametros = self._filtro(grupos, desde, hasta, con_grupo=False)
+        equipos = self._consultar(f'SELECT DISTINCT grupo_equipo, "Equipo" FROM {self._origen} WHERE {filtro}', parametros)
+        # Los registros de un equipo tienen Fecha/Hora únicas: arg_min/arg_max eligen la misma fila que pandas
+        extremos = self._consultar(f'''
+            SELECT grupo_equipo, "Equipo",
+                   primero."Fecha/Hora" AS "Fecha/Hora", primero.lat AS "Latitud", primero.lon AS "Longitud",
+                   ultimo."Fecha/Hora" AS fin, ultimo.lat AS lat_fin, ultimo.lon AS lon_fin
+            FROM (
+                SELECT grupo_equipo, "Equipo",
+                       arg_min({{'Fecha/Hora': "Fecha/Hora", 'lat': "Latitud", 'lon': "Longitud"}}, "Fecha/Hora") AS primero,
+                       arg_max({{'Fecha/Hora': "Fecha/Hora", 'lat': "Latitud", 'lon': "Longitud"}}, "Fecha/Hora") AS ultimo
+                FROM {self._origen}
+                WHERE {filtro} AND "Velocidad" > ?
+                GROUP BY grupo_equipo, "Equipo"
+            )
+        ''', parametros + [VELOCIDAD_LABOR])
+        ultimos = extremos[CLAVES_LABOR + ['fin', 'lat_fin', 'lon_fin']].rename(
+            columns={'fin': 'Fecha/Hora', 'lat_fin': 'Latitud', 'lon_fin': 'Longitud'}
+        )
+        return equipos, extremos[CLAVES_LABOR + ['Fecha/Hora', 'Latitud', 'Longitud']], ultimos
+
+
+class MotorArrow:
+    """Respaldo sin DuckDB: pyarrow.dataset, un fragmento por hilo con agregados parciales que se combinan."""
+    nombre = 'arrow'
+
+    def __init__(self, directorio, hilos=None):
+        self.dataset = abrir_particiones(directorio)
+        self.hilos = hilos or os.cpu_count()
+
+    def _por_fragmento(self, funcion, columnas, grupos, desde, hasta, con_grupo=True):
+        """Aplica `funcion` a cada fragmento (filtrado) en paralelo; solo hay un fragmento por hilo en memoria."""
+        desde, hasta = _rango(desde, hasta)
+        particion, filas = ds.scalar(True), ds.scalar(True)
+        if con_grupo:
+            filas &= ds.field('grupo_equipo').is_valid()
+        if grupos is not None:
+            filas &= ds.field('grupo_equipo').isin([str(g) for g in grupos])
+        if desde is not None:
+            particion &= ds.field('dia') >= desde.strftime('%Y-%m-%d')
+            filas &= ds.field('Hora') >= pa.scalar(desde.as_unit('ns'), type=pa.timestamp('ns'))
+        if hasta is not None:
+            particion &= ds.field('dia') <= hasta.strftime('%Y-%m-%d')
+            filas &= ds.field('Hora') <= pa.scalar(hasta.as_unit('ns'), type=pa.timestamp('ns'))
+
+        def procesar(fragmento):
+            return funcion(fragmento.to_table(schema=self.dataset.schema, columns=columnas, filter=filas, use_threads=False))
+
+        fragmentos = list(self.dataset.get_fragments(filter=particion))
+        with ThreadPoolExecutor(max_workers=self.hilos) as pool:
+            return list(pool.map(procesar, fragmentos))
+
+    def sumar_tiempo(self, claves, grupos=None, desde=None, hasta=None):
+        parciales = self._por_fragmento(
+            lambda tabla: tabla.group_by(claves, use_threads=False).aggregate([('tiempo_seg', 'sum')]),
+            claves + ['tiempo_seg'], grupos, desde, hasta
+        )
+        esquema = pa.schema([self.dataset.schema.field(c) for c in claves] + [pa.field('tiempo_seg_sum', pa.float64())])
+        # Sumas de sumas: con tiempo_seg en segundos enteros el resultado no depende del orden
+        total = pa.concat_tables(parciales or [esquema.empty_table()]).group_by(claves).aggregate([('tiempo_seg_sum', 'sum')])
+        df = total.to_pandas().rename(columns={'tiempo_seg_sum_sum': 'tiempo_seg'})
+        return _categorizar(df[claves + ['tiempo_seg']])
+
+    def labor(self, grupos=None, desde=None, hasta=None):
+        columnas = CLAVES_LABOR + ['Fecha/Hora', 'Latitud', 'Longitud']
+
+        def extremos(tabla):
+            equipos = tabla.group_by(CLAVES_LABOR, use_threads=False).aggregate([]).to_pandas()
+            labor = tabla.filter(pc.greater(tabla['Velocidad'], VELOCIDAD_LABOR)).select(columnas).to_pandas()
+            return equipos, labor.sort_values('Fecha/Hora', kind='stable')
+
+        parciales = self._por_fragmento(extremos, columnas + ['Velocidad'], grupos, desde, hasta, con_grupo=False)
+        vacio = pd.DataFrame(columns=columnas)
+        equipos = pd.concat([p[0] for p in parciales] or [vacio[CLAVES_LABOR]], ignore_index=True).drop_duplicates()
+        labor = pd.concat([p[1] for p in parciales] or [vacio], ignore_index=True).sort_values('Fecha/Hora', kind='stable')
+        return equipos, labor.drop_duplicates(CLAVES_LABOR, keep='first'), labor.drop_duplicates(CLAVES_LABOR, keep='last')
+
+
+MOTORES = {'duckdb': MotorDuckDB, 'arrow': MotorArrow}
+
+
+def motores_disponibles():
+    return [nombre for nombre in MOTORES if nombre != 'duckdb' or duckdb is not None]
+
+
+def crear_motor(directorio, motor='auto', hilos=None):
+    """Motor sobre un directorio de particiones; 'auto' usa DuckDB si está instalado y si no pyarrow."""
+    if motor == 'auto':
+        motor = motores_disponibles()[0]
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor} (opciones: auto, {', '.join(MOTORES)})")
+    return MOTORES[motor](directorio, hilos=hilos)
+
+
+# ===============================
+# 📊 CONSULTAS
+# ===============================
+def productividad(motor, grupos=None, desde=None, hasta=None):
+    """productividad_por_equipo sobre el tiempo sumado por (Equipo, Grupo Operacion)."""
+    return productividad_por_equipo(motor.sumar_tiempo(['Equipo', 'Grupo Operacion'], grupos, desde, hasta))
+
+
+def evolucion(motor, grupos=None, desde=None, hasta=None):
+    """evolucion_horaria sobre el tiempo sumado por (Hora, Grupo Operacion)."""
+    return evolucion_horaria(motor.sumar_tiempo(['Hora', 'Grupo Operacion'], grupos, desde, hasta))
+
+
+def alertas(motor, grupos=None, desde=None, hasta=None):
+    """Equipos en alerta según REGLAS_ALERTA sobre el período completo (o el rango dado)."""
+    return evaluar_alertas(resumen_inactividad(motor.sumar_tiempo(['Equipo', 'Grupo Operacion'], grupos, desde, hasta)))
+
+
+def inicio_labor(motor, grupos=None, desde=None, hasta=None):
+    """resumen_labor armado con el primer y último registro de labor que devuelve el motor."""
+    equipos, primeros, ultimos = motor.labor(grupos, desde, hasta)
+    claves = {c: object for c in CLAVES_LABOR}
+    return _categorizar(armar_resumen_labor(equipos.astype(object), primeros.astype(claves), ultimos.astype(claves)))
+
+
+CONSULTAS = {
+    'productividad': productividad,
+    'evolucion_horaria': evolucion,
+    'alertas': alertas,
+    'inicio_labor': inicio_labor,
+}
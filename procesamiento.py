@@ -0,0 +1,1083 @@
+import glob
+import hashlib
+import io
+import operator
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# ===============================
+# 📥 LECTURA DE TELEMETRÍA
+# ===============================
+# Columnas del export que usa la app (las de GPS son opcionales)
+COLUMNAS_TELEMETRIA = ['Fecha/Hora', 'Equipo', 'Grupo Operacion', 'Grupo Equipo/Frente', 'Latitud', 'Longitud', 'Velocidad']
+COLUMNAS_CATEGORICAS = ['Equipo', 'Grupo Operacion', 'grupo_equipo']
+COLUMNAS_NUMERICAS = ['Latitud', 'Longitud', 'Velocidad']
+# Columnas del frame preparado que necesitan las vistas de productividad y alertas (sin GPS)
+COLUMNAS_BASE = ['Fecha/Hora', 'Equipo', 'Grupo Operacion', 'grupo_equipo', 'Hora', 'tiempo_seg']
+
+FORMATO_FECHA = '%d/%m/%Y %H:%M:%S'
+TAMANO_BLOQUE = 500_000
+
+
+def _convertir_fechas(serie):
+    """Parseo con formato fijo (strptime de Arrow); si el bloque no lo cumple se recurre a la inferencia con dayfirst."""
+    texto = pa.array(serie, type=pa.string(), from_pandas=True)
+    fechas = pc.strptime(texto, format=FORMATO_FECHA, unit='s', error_is_null=True)
+    if fechas.null_count == len(fechas) and texto.null_count < len(texto):
+        return pd.to_datetime(serie, dayfirst=True, errors='coerce').astype('datetime64[ns]')
+    return pd.Series(fechas.to_numpy(zero_copy_only=False), index=serie.index).astype('datetime64[ns]')
+
+
+def _preparar_bloque(bloque):
+    bloque = bloque.rename(columns={'Grupo Equipo/Frente': 'grupo_equipo'})
+    bloque['Fecha/Hora'] = _convertir_fechas(bloque['Fecha/Hora'])
+    bloque = bloque.dropna(subset=['Fecha/Hora'])
+    bloque['Grupo Operacion'] = bloque['Grupo Operacion'].replace('AUXILIAR', 'PRODUCTIVO')
+    for col in COLUMNAS_NUMERICAS:
+        if col in bloque.columns:
+            bloque[col] = pd.to_numeric(bloque[col], errors='coerce').astype('float32')
+    for col in COLUMNAS_CATEGORICAS:
+        if col in bloque.columns:
+            bloque[col] = bloque[col].astype('category')
+    return bloque
+
+
+def _concatenar_bloques(bloques):
+    """Concatena conservando las columnas categóricas (unifica categorías antes de unir)."""
+    if not bloques:
+        return pd.DataFrame(columns=COLUMNAS_TELEMETRIA).rename(columns={'Grupo Equipo/Frente': 'grupo_equipo'})
+    for col in COLUMNAS_CATEGORICAS:
+        if col not in bloques[0].columns:
+            continue
+        categorias = sorted(set().union(*(b[col].cat.categories for b in bloques)))
+        for b in bloques:
+            b[col] = b[col].cat.set_categories(categorias)
+    return pd.concat(bloques, ignore_index=True)
+
+
+def _leer_crudo(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """Parseo por bloques de un archivo (ruta, archivo abierto o bytes), sin ordenar ni calcular tiempo_seg."""
+    if isinstance(archivo, bytes):
+        archivo = io.BytesIO(archivo)
+    lector = pd.read_csv(
+        archivo, sep=';', encoding='utf-8',
+        usecols=lambda col: col in COLUMNAS_TELEMETRIA,
+        dtype={'Fecha/Hora': str, 'Equipo': str, 'Grupo Operacion': str, 'Grupo Equipo/Frente': str},
+        chunksize=tamano_bloque
+    )
+    return _concatenar_bloques([_preparar_bloque(bloque) for bloque in lector])
+
+
+def _completar_telemetria(df):
+    """Hora, orden por equipo y tiempo_seg sobre el frame ya unido (la diferencia cruza bloques y archivos)."""
+    df['Hora'] = df['Fecha/Hora'].dt.floor('h')
+    df = df.sort_values(['Equipo', 'Fecha/Hora'], ignore_index=True)
+    df['tiempo_seg'] = df.groupby('Equipo', observed=True)['Fecha/Hora'].diff().shift(-1).dt.total_seconds().fillna(0)
+    return df.dropna(axis=1, how='all')
+
+
+@contextmanager
+def _medir_pico(medir_memoria, carga):
+    """Pico del heap de Python del bloque en carga['pico_memoria_mb'], solo si tracemalloc lo enciende este bloque.
+
+    Si ya estaba encendido (p. ej. por el panel de rendimiento) no se toca: apagarlo
+    o reiniciar su pico dejaría sin medición a quien lo encendió. tracemalloc no ve
+    los buffers de Arrow (cadenas y fechas); su pico va en carga['pico_arrow_mb']
+    cuando el bloque supera el máximo histórico del pool de Arrow.
+    """
+    propio = medir_memoria and not tracemalloc.is_tracing()
+    if propio:
+        tracemalloc.start()
+    arrow = pa.default_memory_pool()
+    arrow_inicio, arrow_maximo = arrow.bytes_allocated(), arrow.max_memory()
+    try:
+        yield
+        if propio:
+            carga['pico_memoria_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        if medir_memoria and arrow.max_memory() > arrow_maximo:
+            carga['pico_arrow_mb'] = (arrow.max_memory() - arrow_inicio) / 1024 ** 2
+    finally:
+        if propio:
+            tracemalloc.stop()
+
+
+def leer_telemetria(archivo, tamano_bloque=TAMANO_BLOQUE, medir_memoria=False):
+    """Lee el export de telemetría (separado por ';') por bloques y con esquema compacto.
+
+    Solo se leen las columnas de COLUMNAS_TELEMETRIA: Equipo, Grupo Operacion y
+    grupo_equipo quedan como categóricas y Latitud/Longitud/Velocidad en float32.
+    El ordenamiento y el cálculo de tiempo_seg se hacen sobre el frame ya
+    concatenado, así que la diferencia por equipo es correcta entre bloques.
+    Las estadísticas de la carga (filas, segundos y, con medir_memoria, los picos
+    del heap de Python y de Arrow en MB; ver _medir_pico) quedan en df.attrs['carga'].
+    """
+    carga = {}
+    inicio = time.perf_counter()
+    with _medir_pico(medir_memoria, carga):
+        df = _completar_telemetria(_leer_crudo(archivo, tamano_bloque))
+
+    carga.update(filas=len(df), segundos=time.perf_counter() - inicio)
+    df.attrs['carga'] = carga
+    return df
+
+
+def _contenido(archivo):
+    """Ruta tal cual; un archivo abierto o subido se pasa como bytes para poder enviarlo a otro proceso."""
+    if isinstance(archivo, (str, os.PathLike, bytes)):
+        return archivo
+    archivo.seek(0)
+    contenido = archivo.read()
+    archivo.seek(0)
+    return contenido
+
+
+def leer_telemetria_multiple(archivos, procesos=None, tamano_bloque=TAMANO_BLOQUE, medir_memoria=False):
+    """Lee varios exports (p. ej. uno por día o por turno) en procesos paralelos y los une en un solo frame.
+
+    Cada archivo se parsea en su propio proceso; la unión unifica categorías,
+    descarta los registros repetidos por exportes solapados (mismo Equipo y
+    Fecha/Hora, se conserva el primero) y recalcula tiempo_seg sobre el orden
+    global, así que el último registro de un archivo se cierra con el primero
+    del siguiente. df.attrs['carga'] suma 'archivos', 'duplicados' y
+    'filas_por_segundo'; con medir_memoria los picos son del proceso principal.
+    """
+    archivos = list(archivos)
+    carga = {}
+    inicio = time.perf_counter()
+    with _medir_pico(medir_memoria, carga):
+        if len(archivos) <= 1:
+            crudos = [_leer_crudo(a, tamano_bloque) for a in archivos]
+        else:
+            procesos = procesos or min(len(archivos), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                crudos = list(pool.map(_leer_crudo, [_contenido(a) for a in archivos], repeat(tamano_bloque)))
+        df = _concatenar_bloques(crudos)
+        leidas = len(df)
+        df = df.drop_duplicates(subset=['Equipo', 'Fecha/Hora'], ignore_index=True)
+        df = _completar_telemetria(df)
+
+    segundos = time.perf_counter() - inicio
+    carga.update(
+        filas=len(df), segundos=segundos, archivos=len(archivos),
+        duplicados=leidas - len(df), filas_por_segundo=leidas / segundos if segundos else 0.0
+    )
+    df.attrs['carga'] = carga
+    return df
+
+
+def listar_archivos(entradas):
+    """Rutas absolutas, sin repetir, de archivos .txt, patrones glob o directorios (sus .txt en orden)."""
+    archivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            archivos.extend(sorted(glob.glob(os.path.join(entrada, '*.txt'))))
+        else:
+            archivos.extend(sorted(glob.glob(entrada)) or [entrada])
+    return [os.path.abspath(a) for a in dict.fromkeys(archivos)]
+
+
+# ===============================
+# 💾 CACHÉ EN DISCO (PARQUET) POR CONTENIDO
+# ===============================
+DIRECTORIO_CACHE = os.environ.get('MONITOREO_CACHE_DIR', '.cache_telemetria')
+# Subir este número cuando cambie la preparación de leer_telemetria para invalidar la caché
+VERSION_CACHE = 1
+
+
+def huella_archivo(archivo, tamano_bloque=1 << 20):
+    """Hash del contenido del archivo (ruta o archivo subido) junto con la versión de la caché."""
+    h = hashlib.blake2b(f"v{VERSION_CACHE}".encode(), digest_size=20)
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, 'rb') as f:
+            for bloque in iter(lambda: f.read(tamano_bloque), b''):
+                h.update(bloque)
+    else:
+        archivo.seek(0)
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b''):
+            h.update(bloque)
+        archivo.seek(0)
+    return h.hexdigest()
+
+
+def huella_archivos(archivos):
+    """Hash de un conjunto de archivos; no depende del orden porque la unión se reordena por fecha."""
+    huellas = sorted(huella_archivo(a) for a in archivos)
+    return hashlib.blake2b(' '.join(['multiple'] + huellas).encode(), digest_size=20).hexdigest()
+
+
+def cargar_telemetria(archivo, columnas=None, directorio_cache=DIRECTORIO_CACHE, medir_memoria=False):
+    """Devuelve el frame preparado por leer_telemetria usando una caché Parquet direccionada por contenido.
+
+    `archivo` puede ser también una lista de archivos: se unen con
+    leer_telemetria_multiple y se guardan bajo la huella del conjunto.
+    Si el archivo ya fue procesado se lee solo la proyección de columnas
+    pedida (None = todas); si no, se parsea, se guarda y se proyecta.
+    """
+    inicio = time.perf_counter()
+    os.makedirs(directorio_cache, exist_ok=True)
+    if isinstance(archivo, (list, tuple)) and len(archivo) == 1:
+        archivo = archivo[0]
+    multiple = isinstance(archivo, (list, tuple))
+    huella = huella_archivos(archivo) if multiple else huella_archivo(archivo)
+    ruta = os.path.join(directorio_cache, f"{huella}.parquet")
+
+    if os.path.exists(ruta):
+        disponibles = pq.read_schema(ruta).names
+        seleccion = None if columnas is None else [c for c in columnas if c in disponibles]
+        df = pd.read_parquet(ruta, columns=seleccion)
+        df.attrs['carga'] = {'filas': len(df), 'segundos': time.perf_counter() - inicio, 'cache': True}
+        return df
+
+    if multiple:
+        df = leer_telemetria_multiple(archivo, medir_memoria=medir_memoria)
+    else:
+        df = leer_telemetria(archivo, medir_memoria=medir_memoria)
+    # Escritura atómica: otra sesión puede estar leyendo o escribiendo la misma huella
+    fd, temporal = tempfile.mkstemp(dir=directorio_cache, suffix='.tmp')
+    os.close(fd)
+    try:
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    if columnas is not None:
+        carga = df.attrs['carga']
+        df = df[[c for c in columnas if c in df.columns]]
+        df.attrs['carga'] = carga
+    df.attrs['carga']['cache'] = False
+    return df
+
+
+# ===============================
+# 🧩 PARTICIÓN POR GRUPO EQUIPO/FRENTE
+# ===============================
+class ParticionGrupos:
+    """Frame reordenado una sola vez por grupo_equipo con el rango de filas de cada grupo.
+
+    El orden ['Equipo', 'Fecha/Hora'] se conserva dentro de cada grupo. Una
+    selección de grupos contiguos es un slice (sin copia); las demás se
+    concatenan y se memorizan en un LRU interno de `max_vistas` selecciones.
+    Si algún equipo cambia de grupo, toda selección de varios grupos (también
+    la de todos) se reordena por ['Equipo', 'Fecha/Hora'].
+    """
+
+    def __init__(self, df, max_vistas=8):
+        self.df = df[df['grupo_equipo'].notna()].sort_values('grupo_equipo', kind='stable', ignore_index=True)
+        codigos, grupos = pd.factorize(self.df['grupo_equipo'], sort=False)
+        inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]]) if len(codigos) else np.array([], dtype=int)
+        fines = np.r_[inicios[1:], len(codigos)]
+        self.rangos = {grupo: (int(i), int(f)) for grupo, i, f in zip(grupos, inicios, fines)}
+        self._posicion = {grupo: n for n, grupo in enumerate(self.rangos)}
+
+        # Si algún equipo cambia de grupo, unir grupos rompe su orden temporal y hay que reordenar
+        grupos_por_equipo = self.df.groupby('Equipo', observed=True)['grupo_equipo'].nunique()
+        self._reordenar = bool((grupos_por_equipo > 1).any())
+
+        self._max_vistas = max_vistas
+        self._vistas = OrderedDict()
+        self._candado = threading.Lock()
+
+    @property
+    def grupos(self):
+        return list(self.rangos)
+
+    def _seleccion(self, grupos):
+        """(clave, tramos): grupos presentes en el orden de df y rangos de filas adyacentes ya unidos."""
+        clave = tuple(sorted((g for g in set(grupos) if g in self.rangos), key=self._posicion.get))
+        # Se unen los rangos adyacentes para que la mayoría de selecciones sean un único slice
+        tramos = []
+        for inicio, fin in (self.rangos[g] for g in clave):
+            if tramos and tramos[-1][1] == inicio:
+                tramos[-1][1] = fin
+            else:
+                tramos.append([inicio, fin])
+        return clave, tramos
+
+    def es_copia(self, grupos):
+        """True si la vista de `grupos` se arma concatenando o reordenando filas (no es un slice de df)."""
+        clave, tramos = self._seleccion(grupos)
+        return len(tramos) > 1 or (self._reordenar and len(clave) > 1)
+
+    def vista(self, grupos):
+        """Filas de los grupos seleccionados (equivalente a df[df['grupo_equipo'].isin(grupos)]).
+
+        Con max_vistas=0 no se memoriza nada: quien la guarde en otra caché
+        puede usar es_copia para guardar solo las vistas que ocupan memoria propia.
+        """
+        clave, tramos = self._seleccion(grupos)
+        if len(clave) == len(self.rangos) and not self._reordenar:
+            return self.df
+        with self._candado:
+            if clave in self._vistas:
+                self._vistas.move_to_end(clave)
+                return self._vistas[clave]
+
+        if not tramos:
+            vista = self.df.iloc[0:0]
+        elif len(tramos) == 1:
+            vista = self.df.iloc[tramos[0][0]:tramos[0][1]]
+        else:
+            vista = pd.concat([self.df.iloc[i:f] for i, f in tramos])
+        if self._reordenar and len(clave) > 1:
+            vista = vista.sort_values(['Equipo', 'Fecha/Hora'], kind='stable')
+
+        if self._max_vistas:
+            with self._candado:
+                self._vistas[clave] = vista
+                while len(self._vistas) > self._max_vistas:
+                    self._vistas.popitem(last=False)
+        return vista
+
+# ===============================
+# 📏 MOTOR DE DISTANCIAS VECTORIZADO
+# ===============================
+# Radio medio terrestre (IUGG) para haversine
+RADIO_TIERRA_M = 6371008.8
+
+# Elipsoide WGS84
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+# Velocidad mínima (km/h) a partir de la cual se considera que el equipo está laborando
+VELOCIDAD_LABOR = 7
+
+
+def distancia_haversine(lat1, lon1, lat2, lon2):
+    """Distancia en metros entre pares de puntos sobre la esfera (arrays en grados)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def distancia_elipsoidal(lat1, lon1, lat2, lon2):
+    """Distancia en metros sobre el elipsoide WGS84 usando los radios de curvatura en la latitud media.
+
+    Pensada para segmentos cortos entre fijaciones GPS consecutivas: entre
+    ±60° de latitud, frente a geopy.geodesic el error relativo es < 1e-8 para
+    segmentos de hasta 1 km y < 1e-6 hasta 10 km. Crece hacia los polos
+    (a 80°: ~4e-8 a 1 km y ~4e-6 a 10 km). Haversine se desvía hasta ~0.6%
+    según la latitud.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    lat_media = (lat1 + lat2) / 2
+    sen2 = np.sin(lat_media) ** 2
+    w = np.sqrt(1 - WGS84_E2 * sen2)
+    radio_meridiano = WGS84_A * (1 - WGS84_E2) / w ** 3
+    radio_normal = WGS84_A / w
+    dlon = (lon2 - lon1 + np.pi) % (2 * np.pi) - np.pi
+    dy = radio_meridiano * (lat2 - lat1)
+    dx = radio_normal * np.cos(lat_media) * dlon
+    return np.hypot(dx, dy)
+
+
+METODOS_DISTANCIA = {
+    'haversine': distancia_haversine,
+    'elipsoidal': distancia_elipsoidal,
+}
+
+
+def distancia_segmentos(df, metodo='haversine'):
+    """Distancia (m) de cada fila a la fila anterior del mismo Equipo; 0 en la primera de cada equipo.
+
+    Espera el frame ordenado por ['Equipo', 'Fecha/Hora'] como lo deja cargar_datos.
+    """
+    calcular = METODOS_DISTANCIA[metodo]
+    grupos = df.groupby('Equipo', sort=False, observed=True)
+    lat_prev = grupos['Latitud'].shift()
+    lon_prev = grupos['Longitud'].shift()
+    distancias = calcular(lat_prev, lon_prev, df['Latitud'], df['Longitud'])
+    return pd.Series(np.nan_to_num(distancias, nan=0.0), index=df.index, name='distancia_m')
+
+
+def distancia_por_equipo(df, metodo='haversine'):
+    """Distancia total (m) recorrida por cada Equipo sumando sus segmentos consecutivos."""
+    segmentos = distancia_segmentos(df, metodo)
+    return segmentos.groupby(df['Equipo'], sort=False, observed=True).sum().rename('distancia_m')
+
+
+# ===============================
+# 🚜 INICIO / FIN DE LABOR POR EQUIPO
+# ===============================
+CLAVES_LABOR = ['grupo_equipo', 'Equipo']
+
+
+def resumen_labor(df):
+    """Inicio, fin, duración y coordenadas extremas de labor (Velocidad > VELOCIDAD_LABOR) por (grupo_equipo, Equipo).
+
+    Una sola pasada vectorizada sobre el frame ordenado por ['Equipo', 'Fecha/Hora'].
+    Los equipos sin registros de labor se conservan con valores nulos.
+    """
+    claves = CLAVES_LABOR
+    labor = df.loc[df['Velocidad'] > VELOCIDAD_LABOR, claves + ['Fecha/Hora', 'Latitud', 'Longitud']]
+    return armar_resumen_labor(
+        df[claves].drop_duplicates(),
+        labor[~labor.duplicated(claves, keep='first')],
+        labor[~labor.duplicated(claves, keep='last')]
+    )
+
+
+def armar_resumen_labor(equipos, primeros, ultimos):
+    """Une los pares (grupo_equipo, Equipo) con su primer y último registro de labor (un renglón por par)."""
+    claves = CLAVES_LABOR
+    primeros = primeros.set_index(claves)
+    ultimos = ultimos.set_index(claves)
+
+    resumen = pd.DataFrame({
+        'inicio': primeros['Fecha/Hora'],
+        'fin': ultimos['Fecha/Hora'],
+        'lat_inicio': primeros['Latitud'],
+        'lon_inicio': primeros['Longitud'],
+        'lat_fin': ultimos['Latitud'],
+        'lon_fin': ultimos['Longitud'],
+    })
+    resumen['duracion'] = resumen['fin'] - resumen['inicio']
+
+    resumen = equipos.merge(resumen.reset_index(), on=claves, how='left')
+    return resumen.sort_values(claves).reset_index(drop=True)
+
+
+# ===============================
+# 🧊 CUBO DE AGREGACIÓN (PRODUCTIVIDAD Y ALERTAS)
+# ===============================
+CLAVES_CUBO = ['Equipo', 'grupo_equipo', 'Hora', 'Grupo Operacion']
+BINS_CLASIFICACION = [-1, 60, 80, 100]
+ETIQUETAS_CLASIFICACION = ['Bajo', 'Medio', 'Alto']
+
+
+def construir_cubo(df):
+    """tiempo_seg sumado por (Equipo, grupo_equipo, Hora, Grupo Operacion); base de todas las vistas agregadas.
+
+    Se conservan las filas con Grupo Operacion nulo (cuentan como tiempo parado en las alertas).
+    """
+    cubo = df.groupby(CLAVES_CUBO, observed=True, dropna=False, sort=False)['tiempo_seg'].sum().reset_index()
+    return cubo[cubo['grupo_equipo'].notna()].reset_index(drop=True)
+
+
+def filtrar_cubo(cubo, grupos, desde=None, hasta=None):
+    """Filas de los grupos dados (None = todos) y, si se dan, de las horas entre desde y hasta (llevadas a la hora)."""
+    if grupos is not None:
+        cubo = cubo[cubo['grupo_equipo'].isin(grupos)]
+    if desde is not None:
+        cubo = cubo[cubo['Hora'] >= pd.Timestamp(desde).floor('h')]
+    if hasta is not None:
+        cubo = cubo[cubo['Hora'] <= pd.Timestamp(hasta).floor('h')]
+    return cubo
+
+
+def _tiempo_por_equipo(cubo, mascara=None):
+    datos = cubo if mascara is None else cubo[mascara]
+    return datos.groupby('Equipo', observed=True)['tiempo_seg'].sum()
+
+
+def productividad_por_equipo(cubo):
+    """Tiempo total/productivo, % productivo y clasificación Bajo/Medio/Alto por Equipo."""
+    tiempo_total = _tiempo_por_equipo(cubo)
+    tiempo_prod = _tiempo_por_equipo(cubo, cubo['Grupo Operacion'] == 'PRODUCTIVO')
+
+    resumen = pd.DataFrame({'tiempo_total_seg': tiempo_total, 'tiempo_productivo_seg': tiempo_prod}).fillna(0)
+    resumen['porcentaje_productivo'] = (resumen['tiempo_productivo_seg'] / resumen['tiempo_total_seg']) * 100
+    resumen['tiempo_total_horas'] = resumen['tiempo_total_seg'] / 3600
+    resumen['tiempo_productivo_horas'] = resumen['tiempo_productivo_seg'] / 3600
+    resumen['clasificacion'] = pd.cut(resumen['porcentaje_productivo'], bins=BINS_CLASIFICACION, labels=ETIQUETAS_CLASIFICACION)
+    return resumen.rename_axis('Equipo').reset_index()
+
+
+def evolucion_horaria(cubo):
+    """% productivo por Hora sobre el tiempo total registrado en esa hora."""
+    total_hora = cubo.groupby('Hora')['tiempo_seg'].sum()
+    prod_hora = cubo[cubo['Grupo Operacion'] == 'PRODUCTIVO'].groupby('Hora')['tiempo_seg'].sum()
+
+    resumen_hora = pd.DataFrame({'tiempo_seg': prod_hora, 'tiempo_total': total_hora}).fillna(0)
+    resumen_hora['porcentaje_productivo'] = (resumen_hora['tiempo_seg'] / resumen_hora['tiempo_total']) * 100
+    return resumen_hora.rename_axis('Hora').reset_index()
+
+
+def clasificacion_por_grupo(cubo, productividad):
+    """Reparto (%) del tiempo productivo de cada grupo_equipo según la clasificación de sus equipos."""
+    tiempo_prod = cubo['tiempo_seg'].where(cubo['Grupo Operacion'] == 'PRODUCTIVO', 0)
+    prod = tiempo_prod.groupby([cubo['grupo_equipo'], cubo['Equipo']], observed=True).sum().reset_index()
+    prod['clasificacion'] = prod['Equipo'].map(productividad.set_index('Equipo')['clasificacion']).astype(object)
+
+    resumen_grupo = prod.groupby(['grupo_equipo', 'clasificacion'], observed=True)['tiempo_seg'].sum()
+    porcentaje = resumen_grupo / resumen_grupo.groupby(level='grupo_equipo', observed=True).transform('sum') * 100
+    return porcentaje.unstack('clasificacion').reindex(columns=ETIQUETAS_CLASIFICACION).fillna(0)
+
+
+def resumen_inactividad(cubo):
+    """Horas totales, de mantenimiento y parado (todo lo que no es PRODUCTIVO ni MANTENIMIENTO) por Equipo."""
+    tiempo_total = _tiempo_por_equipo(cubo)
+    mant = _tiempo_por_equipo(cubo, cubo['Grupo Operacion'] == 'MANTENIMIENTO')
+    parado = _tiempo_por_equipo(cubo, ~cubo['Grupo Operacion'].isin(['PRODUCTIVO', 'MANTENIMIENTO']))
+
+    resumen = pd.DataFrame({
+        'tiempo_total_horas': tiempo_total / 3600,
+        'tiempo_mantenimiento_horas': mant / 3600,
+        'tiempo_parado_horas': parado / 3600
+    }).fillna(0)
+    return _porcentajes_inactividad(resumen).rename_axis('Equipo')
+
+
+def _porcentajes_inactividad(resumen):
+    resumen['% mantenimiento'] = resumen['tiempo_mantenimiento_horas'] / resumen['tiempo_total_horas'] * 100
+    resumen['% parado'] = resumen['tiempo_parado_horas'] / resumen['tiempo_total_horas'] * 100
+    resumen['% alerta total'] = resumen['% mantenimiento'] + resumen['% parado']
+    return resumen
+
+
+def inactividad_por_ventana(cubo, horas=1):
+    """resumen_inactividad por (Equipo, Hora) acumulado en la ventana móvil de las últimas `horas` horas.
+
+    Las horas sin registros cuentan como cero dentro de la ventana; solo se
+    devuelven las combinaciones con tiempo total registrado.
+    """
+    if cubo.empty:
+        vacio = pd.DataFrame({
+            'Equipo': pd.Series(dtype=object), 'Hora': pd.Series(dtype='datetime64[ns]'),
+            **{c: pd.Series(dtype=float) for c in ['tiempo_total_horas', 'tiempo_mantenimiento_horas', 'tiempo_parado_horas']},
+        })
+        return _porcentajes_inactividad(vacio)
+    estado = cubo['Grupo Operacion']
+    horas_rango = pd.date_range(cubo['Hora'].min(), cubo['Hora'].max(), freq='h', name='Hora')
+
+    def matriz(mascara=None):
+        datos = cubo if mascara is None else cubo[mascara]
+        tabla = datos.groupby(['Equipo', 'Hora'], observed=True)['tiempo_seg'].sum().unstack('Hora')
+        tabla = tabla.reindex(index=equipos, columns=horas_rango, fill_value=0).fillna(0).to_numpy()
+        # Suma móvil a lo largo de las horas con sumas acumuladas
+        acumulado = np.cumsum(tabla, axis=1)
+        acumulado[:, horas:] -= acumulado[:, :-horas].copy()
+        return acumulado / 3600
+
+    equipos = pd.Index(cubo['Equipo'].unique())
+    total = matriz()
+    resumen = pd.DataFrame({
+        'Equipo': np.repeat(np.asarray(equipos, dtype=object), len(horas_rango)),
+        'Hora': np.tile(horas_rango, len(equipos)),
+        'tiempo_total_horas': total.ravel(),
+        'tiempo_mantenimiento_horas': matriz(estado == 'MANTENIMIENTO').ravel(),
+        'tiempo_parado_horas': matriz(~estado.isin(['PRODUCTIVO', 'MANTENIMIENTO'])).ravel(),
+    })
+    resumen = resumen[resumen['tiempo_total_horas'] > 0].reset_index(drop=True)
+    return _porcentajes_inactividad(resumen)
+
+
+# ===============================
+# 🚨 MOTOR DE REGLAS DE ALERTA
+# ===============================
+# Reglas en orden de prioridad: el equipo recibe el comentario de la primera que cumpla
+REGLAS_ALERTA = [
+    {'comentario': '🛠 100% mantenimiento', 'columna': '% mantenimiento', 'operador': '>=', 'umbral': 100},
+    {'comentario': '🟥 100% parado', 'columna': '% parado', 'operador': '>=', 'umbral': 100},
+    {'comentario': '🚨 Inactivo >80%', 'columna': '% alerta total', 'operador': '>=', 'umbral': 80},
+    {'comentario': '🔔 Alta inactividad', 'columna': '% alerta total', 'operador': '>', 'umbral': 60},
+]
+OPERADORES = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '==': operator.eq}
+
+
+def evaluar_alertas(resumen, reglas=REGLAS_ALERTA):
+    """Asigna a cada fila el comentario de la primera regla que cumple (np.select) y devuelve solo las filas en alerta."""
+    condiciones = [OPERADORES[r['operador']](resumen[r['columna']], r['umbral']).to_numpy() for r in reglas]
+    resumen = resumen.copy()
+    resumen['comentario'] = np.select(condiciones, [r['comentario'] for r in reglas], default='')
+    return resumen[resumen['comentario'] != '']
+
+
+def agrupar_alertas(alertas):
+    """Equipos en alerta agrupados por comentario ('comentario', 'equipos' separados por coma)."""
+    equipos = alertas['Equipo'] if 'Equipo' in alertas.columns else alertas.index.to_series()
+    agrupado = equipos.astype(str).groupby(alertas['comentario'].to_numpy()).agg(', '.join)
+    return agrupado.rename_axis('comentario').reset_index(name='equipos')
+
+
+# ===============================
+# 📌 ÍNDICE AS-OF DE ÚLTIMO ESTADO
+# ===============================
+class IndiceUltimoEstado:
+    """Índice ordenado por (Equipo, Fecha/Hora) para consultar el estado de cada equipo en cualquier instante.
+
+    Cada equipo ocupa un bloque contiguo; las marcas de tiempo se desplazan por
+    bloque para que una sola búsqueda binaria (np.searchsorted) resuelva todos
+    los equipos y todos los instantes consultados a la vez. Las claves van en
+    segundos (la resolución del exporte): en nanosegundos, equipos × rango
+    desborda int64 desde ~1.000 equipos y 107 días.
+    """
+
+    def __init__(self, df):
+        df = df.sort_values(['Equipo', 'Fecha/Hora'])
+        codigos_equipo, self.equipos = pd.factorize(df['Equipo'], sort=False)
+        self.tiempos = df['Fecha/Hora'].to_numpy('datetime64[ns]').view('int64')
+
+        self.inicio_bloques = np.flatnonzero(np.r_[True, codigos_equipo[1:] != codigos_equipo[:-1]])
+        self.fin_bloques = np.r_[self.inicio_bloques[1:], len(codigos_equipo)]
+
+        self._extremos = (self.tiempos.min(), self.tiempos.max()) if len(self.tiempos) else (0, 0)
+        segundos = self.tiempos // 10 ** 9
+        self._origen = segundos.min() if len(segundos) else 0
+        self._ancho = (segundos.max() - self._origen + 1) if len(segundos) else 1
+        self._claves = np.repeat(np.arange(len(self.inicio_bloques)), self.fin_bloques - self.inicio_bloques) * self._ancho + (segundos - self._origen)
+
+        estados = df['Grupo Operacion'].astype('category')
+        self.estados = estados.cat.categories
+        self.codigos_estado = estados.cat.codes.to_numpy()
+        self.grupos = df['grupo_equipo'].astype(object).to_numpy()
+
+    @property
+    def rango(self):
+        return pd.Timestamp(self._extremos[0]), pd.Timestamp(self._extremos[1])
+
+    def _posiciones(self, momentos, ventana=None):
+        """Posición del último registro de cada equipo (filas) en o antes de cada instante (columnas); -1 si no hay."""
+        momentos = pd.DatetimeIndex(momentos).as_unit('ns').asi8
+        desplazados = np.clip(momentos // 10 ** 9 - self._origen, -1, self._ancho - 1)
+        bloques = np.arange(len(self.inicio_bloques))[:, None]
+        posiciones = np.searchsorted(self._claves, bloques * self._ancho + desplazados[None, :], side='right') - 1
+
+        validas = posiciones >= self.inicio_bloques[:, None]
+        if ventana is not None:
+            limite = momentos - pd.Timedelta(ventana).value
+            validas &= self.tiempos[np.maximum(posiciones, 0)] > limite[None, :]
+        return np.where(validas, posiciones, -1)
+
+    def estado_en(self, momento, ventana=None, grupos=None):
+        """Último registro de cada equipo en o antes de `momento` (solo registros dentro de `ventana`, si se da)."""
+        posiciones = self._posiciones([momento], ventana)[:, 0]
+        equipos = posiciones >= 0
+        posiciones = posiciones[equipos]
+        resultado = pd.DataFrame({
+            'Equipo': self.equipos[equipos],
+            'grupo_equipo': self.grupos[posiciones],
+            'Grupo Operacion': pd.Categorical.from_codes(self.codigos_estado[posiciones], self.estados),
+            'Fecha/Hora': pd.to_datetime(self.tiempos[posiciones]),
+        })
+        if grupos is not None:
+            resultado = resultado[resultado['grupo_equipo'].isin(grupos)]
+        return resultado.reset_index(drop=True)
+
+    def conteo_en(self, momento, ventana=None, grupos=None):
+        """Cantidad de equipos por Grupo Operacion en `momento`."""
+        estado = self.estado_en(momento, ventana, grupos)
+        return estado.groupby('Grupo Operacion', observed=True)['Equipo'].nunique().reset_index(name='Cantidad')
+
+    def linea_tiempo(self, paso='15min', ventana=None, grupos=None, inicio=None, fin=None):
+        """Cantidad de equipos por Grupo Operacion en cada paso de `paso` entre inicio y fin (por defecto todo el rango)."""
+        primero, ultimo = self.rango
+        momentos = pd.date_range((inicio or primero).floor(paso), fin or ultimo, freq=paso)
+        posiciones = self._posiciones(momentos, ventana)
+        if grupos is not None:
+            en_grupos = pd.Series(self.grupos[np.maximum(posiciones, 0)].ravel()).isin(grupos).to_numpy()
+            posiciones = np.where(en_grupos.reshape(posiciones.shape), posiciones, -1)
+
+        codigos = np.where(posiciones >= 0, self.codigos_estado[np.maximum(posiciones, 0)], -1)
+        n_estados = len(self.estados)
+        # Conteo por (instante, estado) con un único bincount; -1 (sin registro) queda fuera
+        planos = (codigos + np.arange(len(momentos))[None, :] * (n_estados + 1) + 1).ravel()
+        conteos = np.bincount(planos, minlength=len(momentos) * (n_estados + 1)).reshape(len(momentos), n_estados + 1)
+        return pd.DataFrame(conteos[:, 1:], index=pd.Index(momentos, name='Fecha/Hora'), columns=list(self.estados))
+
+
+# ===============================
+# 🗺️ SIMPLIFICACIÓN DE RECORRIDOS
+# ===============================
+def _proyectar_metros(lat, lon):
+    """Proyección equirectangular local (metros) alrededor de la latitud media del recorrido."""
+    lat = np.asarray(lat, dtype='float64')
+    lon = np.asarray(lon, dtype='float64')
+    lat0 = np.radians(np.nanmean(lat)) if len(lat) else 0.0
+    return RADIO_TIERRA_M * np.radians(lon) * np.cos(lat0), RADIO_TIERRA_M * np.radians(lat)
+
+
+def _douglas_peucker(x, y, candidatos, anclas, tolerancia_m):
+    """Douglas-Peucker iterativo sobre las posiciones `candidatos`, sin eliminar nunca las `anclas`."""
+    conservar = np.zeros(len(x), dtype=bool)
+    conservar[anclas] = True
+    xs, ys = x[candidatos], y[candidatos]
+    es_ancla = np.isin(candidatos, anclas)
+    cortes = np.flatnonzero(es_ancla)
+
+    pila = list(zip(cortes[:-1], cortes[1:]))
+    while pila:
+        i, j = pila.pop()
+        if j - i < 2:
+            continue
+        dx, dy = xs[j] - xs[i], ys[j] - ys[i]
+        px, py = xs[i + 1:j] - xs[i], ys[i + 1:j] - ys[i]
+        largo = np.hypot(dx, dy)
+        if largo == 0:
+            distancias = np.hypot(px, py)
+        else:
+            distancias = np.abs(dx * py - dy * px) / largo
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia_m:
+            k += i + 1
+            conservar[candidatos[k]] = True
+            pila.append((i, k))
+            pila.append((k, j))
+    return conservar
+
+
+def simplificar_recorrido(datos_equipo, tolerancia_m=5.0, intervalo_s=0, max_vertices=5000):
+    """Máscara booleana de los puntos del recorrido que se envían al mapa.
+
+    Aplica decimación temporal (un punto cada `intervalo_s` segundos) y
+    Douglas-Peucker con tolerancia en metros. Siempre conserva el primer y el
+    último punto y los cambios de Grupo Operacion. Si el resultado supera
+    `max_vertices` se duplica la tolerancia hasta cumplir el tope; si ni así
+    alcanza, se submuestrean uniformemente los demás puntos. Los cambios de
+    estado ganan sobre el tope: si son más que `max_vertices`, se devuelven
+    solo ellos y el resultado lo supera.
+    """
+    n = len(datos_equipo)
+    if n <= 2:
+        return np.ones(n, dtype=bool)
+
+    x, y = _proyectar_metros(datos_equipo['Latitud'], datos_equipo['Longitud'])
+    estado = datos_equipo['Grupo Operacion'].astype(object).to_numpy()
+    cambio_estado = np.r_[True, estado[1:] != estado[:-1]] | np.r_[estado[:-1] != estado[1:], True]
+    cambio_estado[[0, -1]] = True
+    anclas = np.flatnonzero(cambio_estado)
+
+    candidatos = np.arange(n)
+    if intervalo_s and intervalo_s > 0:
+        segundos = datos_equipo['Fecha/Hora'].to_numpy('datetime64[s]').astype('int64')
+        ventana = segundos // int(intervalo_s)
+        primero_ventana = np.r_[True, ventana[1:] != ventana[:-1]]
+        candidatos = np.flatnonzero(primero_ventana | cambio_estado)
+
+    tope = max(max_vertices, len(anclas))
+    tolerancia = float(tolerancia_m)
+    conservar = _douglas_peucker(x, y, candidatos, anclas, tolerancia)
+    while conservar.sum() > tope and tolerancia < 1e6:
+        tolerancia = max(tolerancia, 1.0) * 2
+        conservar = _douglas_peucker(x, y, candidatos, anclas, tolerancia)
+
+    if conservar.sum() > tope:
+        # Las anclas quedan; el cupo restante se reparte uniformemente entre los demás puntos
+        libres = np.flatnonzero(conservar & ~cambio_estado)
+        cupo = tope - len(anclas)
+        conservar[libres] = False
+        if cupo:
+            conservar[libres[::int(np.ceil(len(libres) / cupo))]] = True
+    return conservar
+
+
+# ===============================
+# 🛑 DETECCIÓN DE PARADAS (RUN-LENGTH)
+# ===============================
+ESTADOS_PARADA = ['PERDIDA', 'MANTENIMIENTO']
+# Velocidad (km/h) por debajo de la cual un registro cuenta como detenido aunque su estado sea otro
+VELOCIDAD_PARADA = 1.0
+
+
+def detectar_paradas(df, duracion_min_s=120, velocidad_parada=VELOCIDAD_PARADA):
+    """Eventos de parada por Equipo: tramos consecutivos detenidos con el mismo Grupo Operacion.
+
+    Un registro está detenido si su estado está en ESTADOS_PARADA o su
+    Velocidad es <= velocidad_parada. Los tramos se codifican por longitud de
+    racha sobre el frame ordenado por ['Equipo', 'Fecha/Hora'] (como lo deja
+    cargar_datos) y se agregan en un único groupby. Devuelve inicio, fin,
+    duración (suma de tiempo_seg), centroide y estado de cada evento que dure
+    al menos duracion_min_s.
+    """
+    # La normalización del texto se hace sobre las categorías, no fila a fila
+    estados = df['Grupo Operacion'].astype('category')
+    normalizados = estados.cat.categories.astype(str).str.strip().str.upper()
+    estado = estados.cat.codes.to_numpy()
+    detenido = np.r_[np.isin(normalizados, ESTADOS_PARADA), False][estado]
+    if 'Velocidad' in df.columns:
+        detenido |= (df['Velocidad'] <= velocidad_parada).to_numpy()
+
+    equipo = pd.factorize(df['Equipo'])[0]
+    corte = np.r_[True, (equipo[1:] != equipo[:-1]) | (detenido[1:] != detenido[:-1]) | (estado[1:] != estado[:-1])]
+    racha = np.cumsum(corte)
+
+    columnas = {'Equipo': df['Equipo'], 'grupo_equipo': df['grupo_equipo'], 'Grupo Operacion': df['Grupo Operacion'],
+                'Fecha/Hora': df['Fecha/Hora'], 'tiempo_seg': df['tiempo_seg']}
+    for col in ('Latitud', 'Longitud'):
+        if col in df.columns:
+            columnas[col] = df[col].astype('float64')
+    tramos = pd.DataFrame(columnas)[detenido]
+
+    agregaciones = {
+        'Equipo': ('Equipo', 'first'),
+        'grupo_equipo': ('grupo_equipo', 'first'),
+        'estado': ('Grupo Operacion', 'first'),
+        'inicio': ('Fecha/Hora', 'first'),
+        'duracion_seg': ('tiempo_seg', 'sum'),
+        'registros': ('tiempo_seg', 'size'),
+    }
+    if 'Latitud' in tramos.columns:
+        agregaciones['lat'] = ('Latitud', 'mean')
+        agregaciones['lon'] = ('Longitud', 'mean')
+    eventos = tramos.groupby(racha[detenido], sort=False).agg(**agregaciones)
+
+    eventos = eventos[eventos['duracion_seg'] >= duracion_min_s]
+    # tiempo_seg llega hasta el registro siguiente, así que el evento termina en inicio + duración
+    eventos['duracion'] = pd.to_timedelta(eventos['duracion_seg'], unit='s')
+    eventos['fin'] = eventos['inicio'] + eventos['duracion']
+    return eventos.reset_index(drop=True)
+
+
+# ===============================
+# 🌡️ MALLA ESPACIAL DE TIEMPO POR ESTADO
+# ===============================
+TAMANO_CELDA_M = 100
+MAX_CELDAS = 5000
+
+
+def agregar_por_celda(df, tamano_celda_m=TAMANO_CELDA_M, estados=None, max_celdas=MAX_CELDAS):
+    """tiempo_seg sumado por celda de una malla fija (en metros) y Grupo Operacion (solo `estados`, si se dan), en una sola pasada.
+
+    La malla es global: la fila sale de la latitud y el ancho en longitud se
+    ajusta con el coseno del centro de cada fila, así que una celda tiene el
+    mismo identificador en cualquier selección. Se devuelven a lo sumo
+    `max_celdas` celdas (las de más tiempo), de modo que lo que se dibuja no
+    depende de la cantidad de fijaciones GPS.
+    """
+    datos = df.dropna(subset=['Latitud', 'Longitud'])
+    if estados is not None:
+        datos = datos[datos['Grupo Operacion'].isin(estados)]
+    paso_lat = tamano_celda_m / (np.pi * RADIO_TIERRA_M / 180)
+    lat = datos['Latitud'].to_numpy('float64')
+    lon = datos['Longitud'].to_numpy('float64')
+    fila = np.floor(lat / paso_lat).astype('int64')
+    paso_lon = paso_lat / np.cos(np.radians((fila + 0.5) * paso_lat))
+    columna = np.floor(lon / paso_lon).astype('int64')
+
+    # Clave entera única por (fila, columna, estado): un factorize y dos bincount en lugar de un groupby de tres claves
+    estados = datos['Grupo Operacion'].astype('category')
+    codigo_estado = estados.cat.codes.to_numpy().astype('int64') + 1  # 0 = estado nulo
+    n_estados = len(estados.cat.categories) + 1
+    fila_min = fila.min() if len(fila) else 0
+    columna_min = columna.min() if len(columna) else 0
+    n_columnas = (columna.max() - columna_min + 1) if len(columna) else 1
+    clave = ((fila - fila_min) * n_columnas + (columna - columna_min)) * n_estados + codigo_estado
+    codigos, claves = pd.factorize(clave)
+
+    celdas = pd.DataFrame({
+        'fila': claves // n_estados // n_columnas + fila_min,
+        'columna': claves // n_estados % n_columnas + columna_min,
+        'Grupo Operacion': pd.Categorical.from_codes(claves % n_estados - 1, estados.cat.categories),
+        'tiempo_seg': np.bincount(codigos, weights=datos['tiempo_seg'].to_numpy('float64'), minlength=len(claves)),
+        'registros': np.bincount(codigos, minlength=len(claves)),
+    })
+    if len(celdas) > max_celdas:
+        celdas = celdas.nlargest(max_celdas, 'tiempo_seg')
+
+    centro_lat = (celdas['fila'] + 0.5) * paso_lat
+    celdas['lat'] = centro_lat
+    celdas['lon'] = (celdas['columna'] + 0.5) * paso_lat / np.cos(np.radians(centro_lat))
+    return celdas.reset_index(drop=True)
+
+
+# ===============================
+# 🔄 INGESTA INCREMENTAL (ARCHIVOS QUE CRECEN)
+# ===============================
+# Bloques guardados antes de compactar (cada actualización agrega uno: ~2.880 por día con refresco de 30 s)
+MAX_BLOQUES_INCREMENTAL = 32
+
+
+def _clave_cubo(fila):
+    # Los nulos se normalizan a None para que la tupla sirva de clave de diccionario
+    return tuple(None if pd.isna(v) else v for v in fila)
+
+
+class TelemetriaIncremental:
+    """Sigue un archivo (o los .txt de un directorio) y procesa solo los bytes agregados desde la última lectura.
+
+    Cada actualización parsea las líneas nuevas completas (una línea sin salto
+    final se deja para la siguiente), cierra el tiempo_seg del último registro
+    previo de cada Equipo con el primer registro nuevo y suma la diferencia al
+    cubo en su lugar. Si llegan registros con fecha igual o anterior al último
+    ya procesado del equipo (exportes solapados, atrasos) o un archivo se
+    achica, se reconstruye todo desde los bloques guardados o desde cero.
+    Pasados MAX_BLOQUES_INCREMENTAL bloques, los de las actualizaciones se unen
+    en uno. El frame completo solo se arma (una vez por versión) cuando una
+    vista lo pide.
+    """
+
+    def __init__(self, ruta, tamano_bloque=TAMANO_BLOQUE):
+        self.ruta = ruta
+        self.tamano_bloque = tamano_bloque
+        self.version = 0
+        self.estadisticas = {'filas': 0, 'filas_nuevas': 0, 'segundos': 0.0, 'reconstrucciones': 0}
+        self._candado = threading.Lock()
+        self._reiniciar()
+        self.actualizar()
+
+    def _reiniciar(self):
+        self._lecturas = {}  # ruta -> [bytes procesados, línea de encabezado]
+        self._bloques = []   # bloques preparados, cada uno ordenado por (Equipo, Fecha/Hora)
+        # Último registro de cada equipo: dónde está (bloque, fila) y a qué celda del cubo suma
+        self._ultimos = pd.DataFrame({
+            'Fecha/Hora': pd.Series(dtype='datetime64[ns]'), 'bloque': pd.Series(dtype=int), 'fila': pd.Series(dtype=int),
+            'grupo_equipo': pd.Series(dtype=object), 'Hora': pd.Series(dtype='datetime64[ns]'), 'Grupo Operacion': pd.Series(dtype=object),
+        })
+        self._frame = None
+        self.cubo = construir_cubo(pd.DataFrame({c: pd.Series(dtype=object) for c in CLAVES_CUBO + ['tiempo_seg']}))
+        self._posiciones_cubo = {}
+
+    def _archivos(self):
+        return [a for a in listar_archivos([self.ruta]) if os.path.isfile(a)]
+
+    def _leer_agregado(self):
+        """Bytes nuevos (solo líneas completas) de cada archivo, con su encabezado, parseados como un bloque crudo."""
+        crudos = []
+        for archivo in self._archivos():
+            leidos, encabezado = self._lecturas.get(archivo, (0, b''))
+            tamano = os.path.getsize(archivo)
+            if tamano < leidos:
+                return None  # archivo truncado o reemplazado
+            if tamano == leidos:
+                continue
+            with open(archivo, 'rb') as f:
+                f.seek(leidos)
+                datos = f.read(tamano - leidos)
+            datos = datos[:datos.rfind(b'\n') + 1]
+            if not datos:
+                continue
+            self._lecturas[archivo] = (leidos + len(datos), encabezado or datos[:datos.find(b'\n') + 1])
+            if not encabezado:
+                encabezado, datos = datos[:datos.find(b'\n') + 1], datos[datos.find(b'\n') + 1:]
+            if datos:
+                crudos.append(_leer_crudo(encabezado + datos, self.tamano_bloque))
+        return crudos
+
+    def actualizar(self):
+        """Procesa lo agregado desde la última llamada; devuelve la cantidad de registros nuevos."""
+        with self._candado:
+            inicio = time.perf_counter()
+            filas = self.estadisticas['filas']
+            crudos = self._leer_agregado()
+            if crudos is None:
+                filas = 0
+                self._reiniciar()
+                crudos = self._leer_agregado()
+                self._reconstruir(crudos)
+            elif not crudos:
+                return 0
+            else:
+                nuevos = _concatenar_bloques(crudos).drop_duplicates(subset=['Equipo', 'Fecha/Hora'], ignore_index=True)
+                if not self._agregar(nuevos):
+                    self._reconstruir(crudos)
+            if len(self._bloques) > MAX_BLOQUES_INCREMENTAL:
+                self._compactar()
+            self.estadisticas['filas'] = sum(len(b) for b in self._bloques)
+            self.estadisticas['filas_nuevas'] = self.estadisticas['filas'] - filas
+            self.estadisticas['segundos'] = time.perf_counter() - inicio
+            self.version += 1
+            self._frame = None
+            return self.estadisticas['filas_nuevas']
+
+    def _reconstruir(self, crudos):
+        """Camino completo (carga inicial o registros fuera de orden): une todo y recalcula como leer_telemetria_multiple."""
+        df = _concatenar_bloques(self._bloques + crudos).drop_duplicates(subset=['Equipo', 'Fecha/Hora'], ignore_index=True)
+        self._bloques = []
+        self._ultimos = self._ultimos.iloc[:0]
+        self.cubo = self.cubo.iloc[:0]
+        self._posiciones_cubo = {}
+        if len(df):
+            self._agregar(df)
+        if self.version:
+            self.estadisticas['reconstrucciones'] += 1
+
+    def _agregar(self, nuevos):
+        """Agrega un bloque cuyos registros son todos posteriores al último de su equipo; False si no lo son."""
+        categorias = nuevos['Equipo'].cat.categories
+        previos = self._ultimos.reindex(categorias).dropna(subset=['Fecha/Hora'])
+        if len(previos):
+            limites = np.r_[self._ultimos['Fecha/Hora'].reindex(categorias).to_numpy(), np.datetime64('NaT')]
+            if (nuevos['Fecha/Hora'].to_numpy() <= limites[nuevos['Equipo'].cat.codes.to_numpy()]).any():
+                return False
+
+        bloque = _completar_telemetria(nuevos)
+        numero = len(self._bloques)
+        codigos = bloque['Equipo'].cat.codes.to_numpy()
+        equipos = bloque['Equipo'].cat.categories.to_numpy(dtype=object)[codigos]
+        ultimas = np.r_[codigos[1:] != codigos[:-1], True]
+        primeras = np.r_[True, codigos[1:] != codigos[:-1]]
+
+        # Cierre del último registro previo de cada equipo con su primer registro nuevo
+        primeros = pd.Series(bloque['Fecha/Hora'].to_numpy()[primeras], index=equipos[primeras])
+        parches = previos.assign(tiempo_seg=(primeros.reindex(previos.index) - previos['Fecha/Hora']).dt.total_seconds())
+        for numero_bloque, grupo in parches.groupby('bloque'):
+            previo = self._bloques[int(numero_bloque)]
+            columna = previo.columns.get_loc('tiempo_seg')
+            previo.iloc[grupo['fila'].astype(int).to_numpy(), columna] = grupo['tiempo_seg'].to_numpy()
+
+        self._sumar_al_cubo([construir_cubo(bloque), parches.rename_axis('Equipo').reset_index()[CLAVES_CUBO + ['tiempo_seg']]])
+
+        self._bloques.append(bloque)
+        finales = bloque.loc[ultimas, ['Fecha/Hora'] + CLAVES_CUBO[1:]].set_index(equipos[ultimas])
+        finales.insert(1, 'bloque', numero)
+        finales.insert(2, 'fila', np.flatnonzero(ultimas))
+        finales = finales.astype({'grupo_equipo': object, 'Grupo Operacion': object})
+        self._ultimos = pd.concat([self._ultimos.drop(finales.index, errors='ignore'), finales])
+        return True
+
+    def _compactar(self):
+        """Une los bloques de las actualizaciones en uno; si ya suman más filas que el primero, une todos."""
+        desde = 1 if len(self._bloques[0]) >= sum(len(b) for b in self._bloques[1:]) else 0
+        # Cada bloque ya está ordenado y los bloques son sucesivos en el tiempo por equipo
+        unido = _concatenar_bloques(self._bloques[desde:]).sort_values('Equipo', kind='stable', ignore_index=True)
+        self._bloques[desde:] = [unido]
+
+        # El último registro de cada equipo movido es su última fila en el bloque unido
+        codigos = unido['Equipo'].cat.codes.to_numpy()
+        ultimas = np.flatnonzero(np.r_[codigos[1:] != codigos[:-1], True])
+        filas = pd.Series(ultimas, index=unido['Equipo'].cat.categories.to_numpy(dtype=object)[codigos[ultimas]])
+        movidos = (self._ultimos['bloque'] >= desde).to_numpy()
+        self._ultimos.loc[movidos, 'fila'] = filas.reindex(self._ultimos.index[movidos]).to_numpy()
+        self._ultimos.loc[movidos, 'bloque'] = desde
+
+    def _sumar_al_cubo(self, deltas):
+        """Suma los deltas (ya agregados) a las celdas existentes en su lugar y agrega las celdas nuevas al final."""
+        delta = pd.concat([d.astype({c: object for c in COLUMNAS_CATEGORICAS}) for d in deltas], ignore_index=True)
+        agregado = construir_cubo(delta)
+        claves = [_clave_cubo(fila) for fila in zip(*(agregado[c] for c in CLAVES_CUBO))]
+        posiciones = np.array([self._posiciones_cubo.get(clave, -1) for clave in claves], dtype=int)
+        existentes = posiciones >= 0
+
+        if existentes.any():
+            columna = self.cubo.columns.get_loc('tiempo_seg')
+            actuales = self.cubo['tiempo_seg'].to_numpy()[posiciones[existentes]]
+            self.cubo.iloc[posiciones[existentes], columna] = actuales + agregado['tiempo_seg'].to_numpy()[existentes]
+        if not existentes.all():
+            celdas = agregado[~existentes].reset_index(drop=True)
+            for col in COLUMNAS_CATEGORICAS:
+                celdas[col] = celdas[col].astype('category')
+            inicio = len(self.cubo)
+            self.cubo = _concatenar_bloques([self.cubo, celdas]) if inicio else celdas
+            for i, clave in enumerate(c for c, e in zip(claves, existentes) if not e):
+                self._posiciones_cubo[clave] = inicio + i
+
+    def instantanea(self):
+        """Versión y copia del cubo, consistentes entre sí."""
+        with self._candado:
+            return self.version, self.cubo.copy()
+
+    def frame(self, columnas=None):
+        """Frame completo ordenado por (Equipo, Fecha/Hora) como el de leer_telemetria; se arma una vez por versión."""
+        with self._candado:
+            if self._frame is None:
+                df = _concatenar_bloques(list(self._bloques))
+                self._frame = df.sort_values('Equipo', kind='stable', ignore_index=True).dropna(axis=1, how='all')
+            df = self._frame
+        return df if columnas is None else df[[c for c in columnas if c in df.columns]]
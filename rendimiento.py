@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+# ===============================
+# 🔬 TRAMOS DE TIEMPO Y MEMORIA POR ETAPA
+# ===============================
+# Ruta por defecto del registro estructurado (una línea JSON por tramo)
+ARCHIVO_REGISTRO = os.environ.get('MONITOREO_LOG_RENDIMIENTO', 'rendimiento.jsonl')
+
+
+class _TramoInactivo:
+    """Tramo sin efecto: acepta `filas` pero no mide nada."""
+    filas = None
+
+
+# Un solo contexto compartido: con la medición apagada un tramo no crea objetos ni llama al reloj
+_TRAMO_INACTIVO = nullcontext(_TramoInactivo())
+_candado_registro = threading.Lock()
+
+
+class Tramo:
+    def __init__(self, nombre, nivel, filas=None):
+        self.nombre = nombre
+        self.nivel = nivel
+        self.filas = filas
+        self.segundos = 0.0
+        self.memoria_mb = 0.0
+        self.pico_mb = 0.0
+        self.pico_arrow_mb = None
+
+
+class Medidor:
+    """Tramos con nombre alrededor de cada etapa de una ejecución del script.
+
+    Apagado, `tramo()` devuelve siempre el mismo contexto vacío. Encendido,
+    cada tramo guarda segundos, filas (si se informan) y, con tracemalloc,
+    la variación y el pico adicional del heap de Python (incluye NumPy) sobre
+    el inicio del tramo. Los buffers de Arrow (cadenas de pandas, fechas) no
+    pasan por tracemalloc: su pico se toma del pool de Arrow, que solo guarda
+    el máximo histórico, así que se informa cuando el tramo lo supera.
+    tracemalloc se enciende solo mientras dura un tramo de primer nivel (si
+    no lo había encendido otro), así una corrida cortada por st.stop(), un
+    rerun o una excepción no lo deja encendido. Es global al proceso: con
+    varias sesiones a la vez la memoria incluye lo que asignen las demás.
+    """
+
+    def __init__(self, activo=False, archivo_registro=None):
+        self.activo = activo or archivo_registro is not None
+        self.archivo_registro = archivo_registro
+        self.corrida = uuid.uuid4().hex[:8]
+        self.tramos = []
+        self._picos = []
+        self._inicio = time.perf_counter()
+        self._inicio_memoria = False
+
+    def tramo(self, nombre, filas=None):
+        if not self.activo:
+            return _TRAMO_INACTIVO
+        return self._medir(nombre, filas)
+
+    @contextmanager
+    def _medir(self, nombre, filas):
+        tramo = Tramo(nombre, len(self._picos), filas)
+        self.tramos.append(tramo)
+        if not self._picos and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._inicio_memoria = True
+        memoria_inicio, pico_previo = tracemalloc.get_traced_memory()
+        # El pico de tracemalloc se reinicia por tramo; el del tramo padre se reconstruye al cerrar
+        if self._picos:
+            self._picos[-1] = max(self._picos[-1], pico_previo)
+        self._picos.append(0)
+        tracemalloc.reset_peak()
+        arrow = pa.default_memory_pool()
+        arrow_inicio, arrow_maximo = arrow.bytes_allocated(), arrow.max_memory()
+        inicio = time.perf_counter()
+        try:
+            yield tramo
+        finally:
+            tramo.segundos = time.perf_counter() - inicio
+            memoria_fin, pico = tracemalloc.get_traced_memory()
+            pico = max(pico, self._picos.pop())
+            if self._picos:
+                self._picos[-1] = max(self._picos[-1], pico)
+            tramo.memoria_mb = (memoria_fin - memoria_inicio) / 1024 ** 2
+            tramo.pico_mb = max(pico - memoria_inicio, 0) / 1024 ** 2
+            if arrow.max_memory() > arrow_maximo:
+                tramo.pico_arrow_mb = (arrow.max_memory() - arrow_inicio) / 1024 ** 2
+            if not self._picos and self._inicio_memoria:
+                tracemalloc.stop()
+                self._inicio_memoria = False
+
+    def tabla(self):
+        """Desglose de la ejecución: un renglón por tramo, con sangría según el anidamiento."""
+        return pd.DataFrame({
+            'Etapa': [' ' * t.nivel + t.nombre for t in self.tramos],
+            'ms': [round(t.segundos * 1000, 1) for t in self.tramos],
+            'Filas': pd.array([t.filas for t in self.tramos], dtype='Int64'),
+            'Δ memoria (MB)': [round(t.memoria_mb, 2) for t in self.tramos],
+            'Pico heap Python (MB)': [round(t.pico_mb, 2) for t in self.tramos],
+            'Pico Arrow (MB)': pd.array([None if t.pico_arrow_mb is None else round(t.pico_arrow_mb, 2) for t in self.tramos], dtype='Float64'),
+        })
+
+    @property
+    def total_segundos(self):
+        return time.perf_counter() - self._inicio
+
+    def cerrar(self):
+        """Agrega los tramos al registro (si hay uno); apaga tracemalloc si quedó encendido por este medidor."""
+        if self.archivo_registro and self.tramos:
+            momento = datetime.now().isoformat(timespec='milliseconds')
+            lineas = [json.dumps({
+                'momento': momento, 'corrida': self.corrida, 'tramo': t.nombre, 'nivel': t.nivel,
+                'segundos': round(t.segundos, 6), 'filas': t.filas,
+                'memoria_mb': round(t.memoria_mb, 3), 'pico_mb': round(t.pico_mb, 3),
+                'pico_arrow_mb': None if t.pico_arrow_mb is None else round(t.pico_arrow_mb, 3),
+            }, ensure_ascii=False) for t in self.tramos]
+            with _candado_registro, open(self.archivo_registro, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lineas) + '\n')
+        if self._inicio_memoria:
+            tracemalloc.stop()
+            self._inicio_memoria = False
@@ -0,0 +1,120 @@
+"""Generación de reportes PDF de alertas en lote, sin Streamlit.
+
+Genera un reporte por cada archivo de telemetría y cada grupo_equipo:
+
+    python reporte_lote.py exportes/ --salida reportes --procesos 4
+
+Cada archivo se parsea una sola vez en el proceso principal (queda en la
+caché Parquet de procesamiento.cargar_telemetria). Cada tarea es un archivo
+completo: un trabajador lee de esa caché la proyección sin GPS, construye el
+cubo y el índice de estados una sola vez, genera los reportes de todos sus
+grupos y los libera al terminar, así que cada archivo se procesa una vez y
+un trabajador retiene como mucho un archivo.
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+
+from procesamiento import (
+    COLUMNAS_BASE, DIRECTORIO_CACHE, IndiceUltimoEstado, cargar_telemetria, construir_cubo, filtrar_cubo,
+    resumen_inactividad, evaluar_alertas, agrupar_alertas, listar_archivos
+)
+from reportes import generar_grafico_ultimo_estado_para_pdf, generar_pdf_reporte
+
+def _nombre_seguro(texto):
+    return re.sub(r'[^\w.-]+', '_', str(texto)).strip('_')
+
+
+def generar_reporte(cubo_archivo, indice_estados, archivo, grupo, salida):
+    """Genera y guarda el reporte de un grupo_equipo de un archivo; devuelve la ruta y la cantidad de alertas."""
+    grupos = [grupo]
+    cubo = filtrar_cubo(cubo_archivo, grupos)
+
+    alertas = evaluar_alertas(resumen_inactividad(cubo))
+    agrupado = agrupar_alertas(alertas)
+    buf_grafico = generar_grafico_ultimo_estado_para_pdf(cubo, indice_estados, grupos)
+    pdf_bytes = generar_pdf_reporte(buf_grafico, alertas[['% alerta total', 'comentario']], agrupado, grupos)
+
+    nombre = f"reporte_alertas_{_nombre_seguro(os.path.splitext(os.path.basename(archivo))[0])}_{_nombre_seguro(grupo)}.pdf"
+    ruta = os.path.join(salida, nombre)
+    with open(ruta, 'wb') as f:
+        f.write(pdf_bytes)
+    return ruta, len(alertas)
+
+
+def generar_reportes_archivo(archivo, grupos, salida, directorio_cache=DIRECTORIO_CACHE):
+    """Reportes de todos los grupos de un archivo con un solo cubo e índice; [(grupo, ruta, alertas, error)]."""
+    df = cargar_telemetria(archivo, columnas=COLUMNAS_BASE, directorio_cache=directorio_cache)
+    cubo_archivo, indice_estados = construir_cubo(df), IndiceUltimoEstado(df)
+    del df
+    resultados = []
+    for grupo in grupos:
+        try:
+            ruta, n_alertas = generar_reporte(cubo_archivo, indice_estados, archivo, grupo, salida)
+            resultados.append((grupo, ruta, n_alertas, None))
+        except Exception as e:
+            # Un grupo con error no frena los demás del archivo
+            resultados.append((grupo, None, 0, f"{type(e).__name__}: {e}"))
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los reportes PDF de alertas por archivo y grupo_equipo.")
+    parser.add_argument('entradas', nargs='+', help="Archivos .txt, patrones glob o directorios con exportes de telemetría")
+    parser.add_argument('--salida', default='reportes', help="Directorio donde se guardan los PDF (por defecto: reportes)")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(), help="Cantidad de procesos trabajadores (uno por archivo como máximo)")
+    parser.add_argument('--cache', default=DIRECTORIO_CACHE, help="Directorio de la caché Parquet de telemetría")
+    args = parser.parse_args(argv)
+
+    salida = os.path.abspath(args.salida)
+    directorio_cache = os.path.abspath(args.cache)
+    os.makedirs(salida, exist_ok=True)
+
+    inicio = time.perf_counter()
+    tareas = []
+    for archivo in listar_archivos(args.entradas):
+        # Parseo único por archivo: los trabajadores leerán la caché Parquet
+        df = cargar_telemetria(archivo, columnas=['grupo_equipo'], directorio_cache=directorio_cache)
+        grupos = sorted(df['grupo_equipo'].dropna().unique())
+        print(f"📁 {os.path.basename(archivo)}: {df.attrs['carga']['filas']:,} registros, {len(grupos)} grupos")
+        tareas.append((archivo, grupos))
+    fin_carga = time.perf_counter()
+
+    generados = errores = 0
+    with ProcessPoolExecutor(max_workers=min(args.procesos, max(len(tareas), 1))) as pool:
+        futuros = {
+            pool.submit(generar_reportes_archivo, archivo, grupos, salida, directorio_cache): archivo
+            for archivo, grupos in tareas
+        }
+        for futuro in as_completed(futuros):
+            archivo = futuros[futuro]
+            try:
+                resultados = futuro.result()
+            except Exception as e:
+                errores += 1
+                print(f"❌ {os.path.basename(archivo)}: {e}")
+                continue
+            for grupo, ruta, n_alertas, error in resultados:
+                if error is None:
+                    generados += 1
+                    print(f"✅ {os.path.basename(ruta)} ({n_alertas} alertas)")
+                else:
+                    errores += 1
+                    print(f"❌ {os.path.basename(archivo)} / {grupo}: {error}")
+    fin = time.perf_counter()
+
+    duracion = fin - fin_carga
+    print(
+        f"\n📊 {generados} reportes en {duracion:.1f} s ({generados / duracion if duracion else 0:.2f} reportes/s) · "
+        f"carga de archivos {fin_carga - inicio:.1f} s · {errores} errores"
+    )
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
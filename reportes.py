@@ -0,0 +1,102 @@
+import io
+import re
+from datetime import datetime
+
+import pandas as pd
+from fpdf import FPDF
+
+from graficos import renderizar, dibujar_estados
+
+# =====================================================
+# 📄 GENERADOR DE REPORTE EN PDF (compartido por la app y reporte_lote.py)
+# =====================================================
+# Todo el flujo es en memoria y sin estado global (ni archivos temporales ni
+# pyplot), así que se puede ejecutar en paralelo desde varias sesiones o hilos.
+
+# Emojis y etiquetas que se quitan de los comentarios (la fuente del PDF no los soporta)
+_PATRON_COMENTARIO = re.compile(r'🛠|🟥|🚨|🔔|\[MANTENIMIENTO\]|\[PARADO\]|\[INACTIVO >80%\]|\[ALTA INACTIVIDAD\]')
+
+
+def limpiar_comentario(comentario):
+    return ' '.join(_PATRON_COMENTARIO.sub('', comentario).split())
+
+
+# Función para generar el gráfico de último estado (reutiliza el índice as-of de la app)
+def generar_grafico_ultimo_estado_para_pdf(cubo, indice_estados, grupos_seleccionados):
+    if cubo.empty:
+        return None
+
+    # Hora del último registro del archivo (fecha incluida: puede abarcar varios días)
+    hora_obj = indice_estados.rango[1].floor('h')
+
+    # Estado al cierre de esa hora, solo con registros dentro de la hora
+    resumen = indice_estados.conteo_en(hora_obj + pd.Timedelta(hours=1) - pd.Timedelta(1), ventana=pd.Timedelta(hours=1), grupos=grupos_seleccionados)
+    if resumen.empty:
+        return None
+    resumen = resumen.astype({'Grupo Operacion': str})
+    titulo = f"Equipos por Estado Operativo (a las {hora_obj.strftime('%H:%M:%S')} del {hora_obj.strftime('%d/%m/%Y')})"
+    return io.BytesIO(renderizar(dibujar_estados, resumen, figsize=(8, 4), dpi=150, titulo=titulo))
+
+
+# Función para generar el PDF (versión FINAL PULIDA - Streamlit Cloud)
+def generar_pdf_reporte(grafico_buf, alertas_df, comentarios_agrupados, grupos_seleccionados):
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "REPORTE DE ALERTAS OPERATIVAS", ln=True, align='C')
+    pdf.ln(5)
+
+    pdf.set_font("Arial", "", 10)
+    fecha_gen = datetime.now().strftime("%d/%m/%Y")
+    pdf.cell(0, 8, f"Fecha de generación: {fecha_gen}", ln=True)
+    pdf.cell(0, 8, f"Grupos incluidos: {', '.join(grupos_seleccionados)}", ln=True)
+    pdf.ln(10)
+
+    if grafico_buf:
+        # La imagen pasa directo del buffer al PDF
+        pdf.image(grafico_buf, x=15, w=180)
+        pdf.ln(10)
+
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "RESUMEN DE COMENTARIOS AGRUPADOS", ln=True)
+    pdf.ln(3)
+
+    pdf.set_font("Arial", "", 10)
+    if not comentarios_agrupados.empty:
+        for comentario, equipos in zip(comentarios_agrupados['comentario'], comentarios_agrupados['equipos']):
+            pdf.multi_cell(0, 8, f"- Equipos {equipos}: {limpiar_comentario(comentario)}", new_x="LMARGIN", new_y="NEXT")
+    else:
+        pdf.cell(0, 8, "No hay equipos con inactividad crítica.", ln=True)
+
+    pdf.ln(10)
+
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "TABLA DETALLADA DE ALERTAS", ln=True)
+    pdf.ln(3)
+
+    def encabezado_tabla():
+        pdf.set_font("Arial", "B", 10)
+        pdf.set_fill_color(200, 220, 255)
+        pdf.cell(30, 10, "Equipo", 1, 0, 'C', 1)
+        pdf.cell(50, 10, "% Alerta Total", 1, 0, 'C', 1)
+        pdf.cell(0, 10, "Comentario", 1, 1, 'C', 1)
+        pdf.set_font("Arial", "", 10)
+
+    encabezado_tabla()
+    # Las filas se recorren por columnas (sin iterrows) y el encabezado se repite en cada página nueva
+    comentarios_limpios = {c: limpiar_comentario(c) for c in alertas_df['comentario'].unique()}
+    for equipo, alerta, comentario in zip(alertas_df.index.astype(str), alertas_df['% alerta total'], alertas_df['comentario']):
+        if pdf.will_page_break(10):
+            pdf.add_page()
+            encabezado_tabla()
+        pdf.cell(30, 10, equipo, 1)
+        pdf.cell(50, 10, f"{alerta:.1f}%", 1)
+        pdf.cell(0, 10, comentarios_limpios[comentario], 1, 1)
+
+    pdf.ln(15)
+
+    pdf.set_font("Arial", "I", 8)
+    pdf.cell(0, 10, "Generado automáticamente con Monitoreo de Productividad v1.0 - Powered by Santiago Correa, AP Maquinaria y equipos", 0, 1, 'C')
+
+    return bytes(pdf.output(dest='S'))
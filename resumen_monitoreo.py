@@ -1,12 +1,23 @@
+import glob
+import os
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 import folium
 from folium import Marker, Icon
-from folium.plugins import MarkerCluster, AntPath
+from folium.plugins import MarkerCluster, AntPath, HeatMap
 from streamlit_folium import st_folium
-from geopy.distance import geodesic
+from procesamiento import VELOCIDAD_LABOR, METODOS_DISTANCIA, COLUMNAS_BASE, cargar_telemetria, huella_archivo, listar_archivos, distancia_por_equipo, resumen_labor
+from procesamiento import construir_cubo, filtrar_cubo, productividad_por_equipo, evolucion_horaria, clasificacion_por_grupo, resumen_inactividad
+from procesamiento import IndiceUltimoEstado, ParticionGrupos, TelemetriaIncremental, simplificar_recorrido, detectar_paradas
+from procesamiento import TAMANO_CELDA_M, CLAVES_CUBO, agregar_por_celda
+from procesamiento import inactividad_por_ventana, evaluar_alertas, agrupar_alertas
+from motor_consultas import abrir_particiones, crear_motor, leer_particiones, motores_disponibles
+from reportes import generar_grafico_ultimo_estado_para_pdf, generar_pdf_reporte
+from rendimiento import ARCHIVO_REGISTRO, Medidor
+from cache_datos import obtener, estadisticas_cache as estadisticas_cache_datos, detalle_cache
+from graficos import renderizar, estadisticas_cache as estadisticas_cache_graficos, dibujar_estados, dibujar_histograma_productividad, dibujar_torta_clasificacion, dibujar_clasificacion_por_grupo
 
 # ===============================
 # ⚙️ CONFIGURACIÓN GENERAL
@@ -70,30 +81,196 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
-def cargar_datos(archivo):
-    df = pd.read_csv(archivo, sep=';', encoding='utf-8')
-    df['Fecha/Hora'] = pd.to_datetime(df['Fecha/Hora'], dayfirst=True, errors='coerce')
-    df = df.dropna(subset=['Fecha/Hora'])
-    df['Equipo'] = df['Equipo'].astype(str)
-    df['Hora'] = df['Fecha/Hora'].dt.floor('H')
-    df = df.sort_values(['Equipo','Fecha/Hora'])
-    df['tiempo_seg'] = df.groupby('Equipo')['Fecha/Hora'].diff().shift(-1).dt.total_seconds().fillna(0)
-    df.loc[df['Grupo Operacion'] == 'AUXILIAR', 'Grupo Operacion'] = 'PRODUCTIVO'
-    df.rename(columns={'Grupo Equipo/Frente': 'grupo_equipo'}, inplace=True)
-    return df.dropna(axis=1, how='all')
+# Los cargadores guardan su resultado en la caché de datos compartida (cache_datos), con presupuesto de
+# memoria y desalojo LRU; la clave es la huella del contenido, así que sesiones con el mismo archivo comparten entrada
+def _clave(archivo):
+    # Los archivos del directorio local llegan como (ruta, modificación, tamaño); los subidos se identifican por contenido
+    huellas = st.session_state.setdefault('huellas_archivos', {})
+    claves = []
+    for a in archivo:
+        if isinstance(a, tuple):
+            claves.append(a)
+            continue
+        identificador = getattr(a, 'file_id', None)
+        if identificador is None:
+            claves.append(huella_archivo(a))
+            continue
+        if identificador not in huellas:
+            huellas[identificador] = huella_archivo(a)
+        claves.append(huellas[identificador])
+    return tuple(claves)
+
+
+def cargar_datos(archivo, columnas=None):
+    # Caché en disco por contenido: la segunda carga de los mismos archivos no vuelve a parsear el CSV.
+    # La memoria de la carga solo se mide desde el panel de rendimiento (tramo 'cargar_datos')
+    archivos = [a[0] if isinstance(a, tuple) else a for a in archivo]
+    return obtener(('datos', _clave(archivo), columnas), lambda: cargar_telemetria(archivos, columnas=columnas))
+
+
+def cargar_cubo(archivo, motor=None):
+    # Agregado compacto construido una vez por archivo; las vistas de productividad y alertas salen de aquí
+    if motor is not None:
+        # Con particiones lo suma el motor sin cargar la telemetría en memoria
+        return obtener(('cubo', _clave(archivo)), lambda: motor.sumar_tiempo(CLAVES_CUBO))
+    return obtener(('cubo', _clave(archivo)), lambda: construir_cubo(cargar_datos(archivo, tuple(COLUMNAS_BASE))))
+
+
+def _frame(archivo, columnas=None, fuente=None):
+    # En modo incremental el frame lo arma el monitor y con un motor se lee del directorio de particiones;
+    # en ambos casos `archivo` (ruta, versión) solo sirve de clave de caché
+    if isinstance(fuente, TelemetriaIncremental):
+        return fuente.frame(columnas)
+    if fuente is not None:
+        return leer_particiones(archivo[0][0], list(columnas) if columnas else None)
+    return cargar_datos(archivo, columnas)
+
+
+def cargar_paradas(archivo, duracion_min_s, fuente=None):
+    # Eventos de parada de toda la flota; la vista solo filtra por grupo
+    return obtener(('paradas', _clave(archivo), duracion_min_s), lambda: detectar_paradas(_frame(archivo, None, fuente), duracion_min_s))
+
+
+def _particion_gps(archivo, fuente):
+    df = _frame(archivo, None, fuente)
+    if {'Latitud', 'Longitud'}.issubset(df.columns):
+        df = df.dropna(subset=['Latitud', 'Longitud'])
+    # Sin LRU interno: su tamaño crecería después de medirse al entrar en la caché compartida
+    return ParticionGrupos(df, max_vistas=0)
+
+
+def cargar_particion_gps(archivo, fuente=None):
+    # Frame con GPS (coordenadas nulas descartadas una sola vez) particionado por grupo; las vistas por selección no copian
+    return obtener(('particion_gps', _clave(archivo)), lambda: _particion_gps(archivo, fuente))
+
+
+def cargar_vista_gps(archivo, grupos, fuente=None):
+    # Los slices se arman al vuelo; las vistas concatenadas o reordenadas van a la caché compartida con su propio tamaño
+    particion = cargar_particion_gps(archivo, fuente)
+    grupos = tuple(sorted(grupos))
+    if not particion.es_copia(grupos):
+        return particion.vista(grupos)
+    return obtener(('vista_gps', _clave(archivo), grupos), lambda: particion.vista(grupos))
+
+
+def cargar_celdas(archivo, grupos, estados, tamano_celda_m, fuente=None):
+    # Malla agregada de la selección: solo estas celdas viajan al navegador, no las fijaciones GPS
+    return obtener(
+        ('celdas', _clave(archivo), grupos, estados, tamano_celda_m),
+        lambda: agregar_por_celda(cargar_vista_gps(archivo, grupos, fuente), tamano_celda_m, list(estados))
+    )
+
+
+def cargar_indice_estados(archivo, fuente=None):
+    # Índice as-of de solo lectura compartido entre sesiones (no se copia en cada acceso)
+    return obtener(('indice_estados', _clave(archivo)), lambda: IndiceUltimoEstado(_frame(archivo, tuple(COLUMNAS_BASE), fuente)))
+
+
+@st.cache_resource(max_entries=2, ttl='12h')
+def cargar_monitor(ruta):
+    # Un solo monitor por ruta, compartido por todas las sesiones. Retiene todos los registros de la ruta fuera del
+    # presupuesto de cache_datos, así que se guardan pocos; uno desalojado se vuelve a leer completo al pedirlo
+    return TelemetriaIncremental(ruta)
+
+
+@st.cache_resource(max_entries=4)
+def cargar_motor(directorio, nombre, version):
+    # Un motor por directorio y versión de las particiones (el motor arrow fija la lista de archivos al abrirse)
+    return crear_motor(directorio, nombre)
+
+
+def vigilar_monitor(monitor):
+    # Se ejecuta como fragmento con refresco propio: solo si llegaron registros nuevos se vuelve a ejecutar toda la app
+    monitor.actualizar()
+    if monitor.version != st.session_state.get('version_incremental'):
+        st.rerun()
+    estadisticas = monitor.estadisticas
+    st.caption(
+        f"🔄 {estadisticas['filas']:,} registros · última actualización: {estadisticas['filas_nuevas']:,} nuevos "
+        f"en {estadisticas['segundos'] * 1000:.0f} ms · {estadisticas['reconstrucciones']} reconstrucciones"
+    )
+
+# Los controles del panel de rendimiento se dibujan al final de la barra lateral; su valor se lee aquí
+medidor = Medidor(
+    activo=st.session_state.get('panel_rendimiento', False),
+    archivo_registro=ARCHIVO_REGISTRO if st.session_state.get('registro_rendimiento', False) else None
+)
 
 st.sidebar.title("🔧 Panel de Control")
-archivo_cargado = st.sidebar.file_uploader("📁 Cargar archivo .txt", type=["txt"])
+archivos_subidos = st.sidebar.file_uploader("📁 Cargar archivos .txt", type=["txt"], accept_multiple_files=True)
+directorio_local = st.sidebar.text_input("📂 O leer un archivo o directorio local (.txt)", placeholder="ruta/a/exportes")
+modo_incremental = st.sidebar.checkbox("🔄 Seguir la ruta local (procesar solo lo agregado)", disabled=not directorio_local)
+motor_local = st.sidebar.selectbox(
+    "🗃️ Motor para la ruta local", options=['memoria'] + motores_disponibles(), disabled=not directorio_local or modo_incremental,
+    help="Con duckdb o arrow la ruta es un directorio de particiones Parquet (las que escribe servicio_agregados.py --particiones) "
+         "y productividad y alertas se suman fuera de memoria"
+)
 
+# Varios archivos (p. ej. uno por turno) se parsean en paralelo y se unen en un solo frame
+archivo_cargado = tuple(archivos_subidos or ())
+monitor = motor = None
+if not archivo_cargado and directorio_local and modo_incremental:
+    # El monitor mantiene frame y cubo; cada refresco cuesta en proporción a las líneas nuevas
+    monitor = cargar_monitor(directorio_local)
+    segundos_refresco = st.sidebar.number_input("⏱️ Refresco (segundos)", min_value=5, max_value=600, value=30)
+    st.session_state['version_incremental'] = monitor.version
+    with st.sidebar:
+        st.fragment(run_every=segundos_refresco)(vigilar_monitor)(monitor)
+    archivo_cargado = ((directorio_local, monitor.version),) if monitor.estadisticas['filas'] else ()
+elif not archivo_cargado and directorio_local and motor_local != 'memoria':
+    # La clave cambia si se reescribe alguna partición; el cubo lo suma el motor y el índice lee solo sus columnas
+    particiones = sorted(glob.glob(os.path.join(directorio_local, '**', '*.parquet'), recursive=True))
+    if not particiones:
+        st.sidebar.warning("⚠️ No se encontraron particiones Parquet en el directorio")
+    version = tuple((ruta, os.path.getmtime(ruta), os.path.getsize(ruta)) for ruta in particiones)
+    motor = cargar_motor(directorio_local, motor_local, version) if particiones else None
+    archivo_cargado = ((directorio_local, motor_local, version),) if particiones else ()
+elif not archivo_cargado and directorio_local:
+    rutas = [ruta for ruta in listar_archivos([directorio_local]) if os.path.isfile(ruta)]
+    if not rutas:
+        st.sidebar.warning("⚠️ No se encontraron archivos .txt en el directorio")
+    archivo_cargado = tuple((ruta, os.path.getmtime(ruta), os.path.getsize(ruta)) for ruta in rutas)
+
+fuente = monitor if monitor is not None else motor
 if archivo_cargado:
-    df = cargar_datos(archivo_cargado)
-    st.success("✅ Archivo cargado correctamente")
+    if monitor is not None:
+        # El frame completo no se arma en cada versión: solo lo piden el índice de estados y el recorrido
+        filas_cargadas = monitor.estadisticas['filas']
+        carga = {}
+        st.success(f"✅ Siguiendo {directorio_local} en modo incremental")
+    elif motor is not None:
+        filas_cargadas = abrir_particiones(directorio_local).count_rows()
+        carga = {}
+        st.success(f"✅ Consultando {filas_cargadas:,} registros de {directorio_local} con {motor.nombre}")
+    else:
+        # Las vistas de productividad y alertas no necesitan Latitud/Longitud/Velocidad
+        with medidor.tramo('cargar_datos') as tramo:
+            df = cargar_datos(archivo_cargado, tuple(COLUMNAS_BASE))
+            if len(archivo_cargado) > 1:
+                st.success(f"✅ {len(archivo_cargado)} archivos cargados y unidos correctamente")
+            else:
+                st.success("✅ Archivo cargado correctamente")
+            tramo.filas = len(df)
+        filas_cargadas = len(df)
+        carga = df.attrs.get('carga', {})
+    if carga:
+        if carga.get('cache'):
+            st.sidebar.caption(f"📦 {carga['filas']:,} registros leídos de la caché en {carga['segundos']:.2f} s")
+        else:
+            filas_por_segundo = carga.get('filas_por_segundo', carga['filas'] / carga['segundos'] if carga['segundos'] else 0)
+            st.sidebar.caption(f"📦 {carga['filas']:,} registros en {carga['segundos']:.1f} s ({filas_por_segundo:,.0f} registros/s)")
+            if carga.get('duplicados'):
+                st.sidebar.caption(f"🔁 {carga['duplicados']:,} registros repetidos entre archivos descartados")
+
+    # En modo incremental el cubo ya está al día (se actualiza en su lugar con cada lote nuevo)
+    with medidor.tramo('cubo') as tramo:
+        cubo_completo = monitor.instantanea()[1] if monitor is not None else cargar_cubo(archivo_cargado, motor)
+        tramo.filas = len(cubo_completo)
 
     # ================================
     # 🔍 FILTRO MULTIPLE POR GRUPO EQUIPO/FRENTE
     # ================================
-    grupos_disponibles = sorted(df['grupo_equipo'].dropna().unique())
+    grupos_disponibles = sorted(cubo_completo['grupo_equipo'].dropna().unique())
     grupos_seleccionados = st.sidebar.multiselect(
         "🏗️ Filtrar por Grupo Equipo/Frente",
         options=grupos_disponibles,
@@ -103,7 +280,9 @@ if archivo_cargado:
     if not grupos_seleccionados:
         grupos_seleccionados = grupos_disponibles
 
-    df_filtrado_global = df[df['grupo_equipo'].isin(grupos_seleccionados)].copy()
+    with medidor.tramo('cubo.filtro') as tramo:
+        cubo = filtrar_cubo(cubo_completo, grupos_seleccionados)
+        tramo.filas = len(cubo)
 
     # ================================
     # 📑 SELECCIÓN DE PESTAÑA
@@ -117,6 +296,10 @@ if archivo_cargado:
     if pestaña == "📊 Análisis de Productividad":
         st.header("📊 Análisis de Productividad Acumulada y Horaria")
 
+        # El índice de estados (y en modo incremental el frame que lo alimenta) solo se arma en las vistas que lo usan
+        with medidor.tramo('indice_estados', filas=filas_cargadas):
+            indice_estados = cargar_indice_estados(archivo_cargado, fuente)
+
         # Envolver tabs en container para forzar ancho completo
         with st.container():
             tabs = st.tabs(["📌 Último Estado", "📈 % Productivo por Equipo", "⏳ Evolución Horaria", "📋 Clasificación Acumulada"])
@@ -124,68 +307,54 @@ if archivo_cargado:
         with tabs[0]:
             with st.container():  # Forzar expansión
                 st.subheader("📌 Resumen por Grupo de Operación a una Hora Específica")
-                hora_opciones = sorted(df_filtrado_global['Hora'].dt.time.unique())
-                if not hora_opciones:
-                    st.warning("No hay horas disponibles con los filtros aplicados.")
+                primero, ultimo = indice_estados.rango
+                col_fecha, col_hora, col_ventana = st.columns(3)
+                with col_fecha:
+                    fecha = st.date_input("Seleccione la fecha", value=ultimo.date(), min_value=primero.date(), max_value=ultimo.date())
+                with col_hora:
+                    hora_sel = st.time_input("Seleccione la hora de evaluación", value=ultimo.floor('min').time(), step=60)
+                with col_ventana:
+                    ventana_min = st.number_input("Registros de los últimos (minutos)", min_value=1, max_value=24 * 60, value=60)
+                momento = pd.Timestamp.combine(fecha, hora_sel)
+
+                with medidor.tramo('ultimo_estado.conteo'):
+                    resumen = indice_estados.conteo_en(momento, ventana=pd.Timedelta(minutes=ventana_min), grupos=grupos_seleccionados)
+                if resumen.empty:
+                    st.warning(f"No hay datos para la fecha y hora seleccionada: {momento}")
                 else:
-                    hora_str = st.selectbox("Seleccione la hora de evaluación", options=hora_opciones)
-                    fecha = st.date_input("Seleccione la fecha", value=df_filtrado_global['Fecha/Hora'].min().date())
-                    hora_obj = pd.Timestamp.combine(fecha, hora_str.replace(minute=0, second=0, microsecond=0))
-
-                    df_hora = df_filtrado_global[df_filtrado_global['Hora'] == hora_obj]
-                    if df_hora.empty:
-                        st.warning(f"No hay datos para la fecha y hora seleccionada: {hora_obj}")
-                    else:
-                        ultimo_registro = df_hora.sort_values(['Equipo', 'Fecha/Hora']).groupby('Equipo').tail(1)
-                        resumen = ultimo_registro.groupby(['Grupo Operacion'])['Equipo'].nunique().reset_index(name='Cantidad')
-                        colores_personalizados = {
-                            'MANTENIMIENTO': 'blue',
-                            'PERDIDA': 'red',
-                            'PRODUCTIVO': 'green',
-                            'NAO CADASTRADO':'grey'
-                        }
-                        fig, ax = plt.subplots(figsize=(10, 3))  # Aumentado tamaño
-                        sns.barplot(data=resumen, x='Grupo Operacion', y='Cantidad', palette=colores_personalizados, ax=ax)
-                        ax.set_title("Equipos por Estado Operativo")
-                        ax.set_ylim(0, resumen['Cantidad'].max() * 1.2)
-                        for container in ax.containers:
-                            ax.bar_label(container, label_type='edge', padding=3)
-                        st.pyplot(fig)
-                        st.dataframe(resumen, use_container_width=True)
+                    resumen = resumen.astype({'Grupo Operacion': str})
+                    with medidor.tramo('ultimo_estado.grafico'):
+                        st.image(renderizar(dibujar_estados, resumen, figsize=(10, 3)), use_container_width=True)
+                    st.dataframe(resumen, use_container_width=True)
+
+                st.markdown("**🕒 Evolución de estados de la flota durante el día**")
+                paso = st.selectbox("Intervalo", options=['15min', '30min', '60min'])
+                with medidor.tramo('ultimo_estado.linea_tiempo'):
+                    linea = indice_estados.linea_tiempo(paso, ventana=pd.Timedelta(minutes=ventana_min), grupos=grupos_seleccionados)
+                st.area_chart(linea)
 
         with tabs[1]:
             with st.container():  # Forzar expansión
                 st.subheader("📈 % del Tiempo que los Equipos Fueron Productivos")
 
-                tiempo_total = df_filtrado_global.groupby('Equipo')['tiempo_seg'].sum().reset_index(name='tiempo_total_seg')
-                tiempo_prod = df_filtrado_global[df_filtrado_global['Grupo Operacion'] == 'PRODUCTIVO'].groupby('Equipo')['tiempo_seg'].sum().reset_index(name='tiempo_productivo_seg')
-                resumen = pd.merge(tiempo_total, tiempo_prod, on='Equipo', how='left').fillna(0)
-                resumen['porcentaje_productivo'] = (resumen['tiempo_productivo_seg'] / resumen['tiempo_total_seg']) * 100
-                resumen['tiempo_total_horas'] = resumen['tiempo_total_seg'] / 3600
-                resumen['tiempo_productivo_horas'] = resumen['tiempo_productivo_seg'] / 3600
-
-                fig, ax = plt.subplots(figsize=(10, 3))  # Aumentado tamaño
-                ax.hist(resumen['porcentaje_productivo'], bins=10, color='#4fc3f7', edgecolor='black')
-                ax.set_title('Distribución de Productividad (%)')
-                ax.set_xlabel('% Productivo')
-                ax.set_ylabel('Cantidad de Equipos')
-                st.pyplot(fig)
+                with medidor.tramo('productividad.calculo') as tramo:
+                    resumen = productividad_por_equipo(cubo)
+                    tramo.filas = len(resumen)
+
+                with medidor.tramo('productividad.grafico'):
+                    st.image(renderizar(dibujar_histograma_productividad, resumen['porcentaje_productivo'], figsize=(10, 3)), use_container_width=True)
                 st.dataframe(resumen[['Equipo', 'tiempo_total_horas', 'tiempo_productivo_horas', 'porcentaje_productivo']], use_container_width=True)
 
         with tabs[2]:
             with st.container():  # Forzar expansión
                 st.subheader("⏳ Productividad por Hora")
 
-                grupo_opciones = ["Todos"] + sorted(df_filtrado_global['grupo_equipo'].dropna().unique())
+                grupo_opciones = ["Todos"] + sorted(cubo['grupo_equipo'].dropna().unique())
                 grupo_filtro = st.selectbox("Filtrar por Grupo de Equipo / Frente", options=grupo_opciones)
 
-                df_filtrado = df_filtrado_global if grupo_filtro == "Todos" else df_filtrado_global[df_filtrado_global['grupo_equipo'] == grupo_filtro]
-
-                tiempos = df_filtrado.groupby(['Hora', 'Grupo Operacion'])['tiempo_seg'].sum().reset_index()
-                total_hora = tiempos.groupby('Hora')['tiempo_seg'].sum().reset_index(name='tiempo_total')
-                tiempos_prod = tiempos[tiempos['Grupo Operacion'] == 'PRODUCTIVO']
-                resumen_hora = tiempos_prod.merge(total_hora, on='Hora', how='right').fillna(0)
-                resumen_hora['porcentaje_productivo'] = (resumen_hora['tiempo_seg'] / resumen_hora['tiempo_total']) * 100
+                with medidor.tramo('evolucion_horaria'):
+                    cubo_filtrado = cubo if grupo_filtro == "Todos" else cubo[cubo['grupo_equipo'] == grupo_filtro]
+                    resumen_hora = evolucion_horaria(cubo_filtrado)
 
                 st.line_chart(resumen_hora.set_index('Hora')['porcentaje_productivo'])
 
@@ -193,49 +362,17 @@ if archivo_cargado:
             with st.container():  # Forzar expansión
                 st.subheader("📋 Clasificación de Rendimiento Acumulado")
 
-                df_prod = df_filtrado_global[df_filtrado_global['Grupo Operacion'] == 'PRODUCTIVO']
-                tiempo_prod = df_prod.groupby('Equipo')['tiempo_seg'].sum().reset_index(name='tiempo_productivo_seg')
-                tiempo_total = df_filtrado_global.groupby('Equipo')['tiempo_seg'].sum().reset_index(name='tiempo_total_seg')
-                resumen = pd.merge(tiempo_total, tiempo_prod, on='Equipo', how='left').fillna(0)
-                resumen['porcentaje_productivo'] = (resumen['tiempo_productivo_seg'] / resumen['tiempo_total_seg']) * 100
-
-                resumen['clasificacion'] = pd.cut(
-                    resumen['porcentaje_productivo'],
-                    bins=[-1, 60, 80, 100],
-                    labels=['Bajo', 'Medio', 'Alto']
-                )
-
-                col1, col2 = st.columns(2)
-                with col1:
+                with medidor.tramo('clasificacion.calculo'):
+                    resumen = productividad_por_equipo(cubo)
                     clasif_counts = resumen['clasificacion'].value_counts().sort_index()
-                    fig1, ax1 = plt.subplots(figsize=(5, 3))
-                    ax1.pie(clasif_counts, labels=clasif_counts.index, autopct='%1.1f%%',
-                            colors=['#ef5350', '#ffa726', '#66bb6a'], startangle=90)
-                    ax1.axis('equal')
-                    st.pyplot(fig1)
-                with col2:
-                    resumen_equipo_clasif = resumen[['Equipo', 'clasificacion']]
-                    df_con_clasif = df_filtrado_global.merge(resumen_equipo_clasif, on='Equipo', how='left')
-
-                    df_con_clasif['tiempo_prod_seg'] = 0
-                    df_con_clasif.loc[df_con_clasif['Grupo Operacion'] == 'PRODUCTIVO', 'tiempo_prod_seg'] = df_con_clasif['tiempo_seg']
-
-                    resumen_grupo = df_con_clasif.groupby(['grupo_equipo', 'clasificacion'])[['tiempo_prod_seg']].sum().reset_index()
-
-                    total_por_grupo = resumen_grupo.groupby('grupo_equipo')['tiempo_prod_seg'].sum().reset_index()
-                    total_por_grupo = total_por_grupo.rename(columns={'tiempo_prod_seg': 'tiempo_total_grupo'})
-
-                    resumen_grupo = resumen_grupo.merge(total_por_grupo, on='grupo_equipo')
-                    resumen_grupo['porcentaje_productivo'] = (resumen_grupo['tiempo_prod_seg'] / resumen_grupo['tiempo_total_grupo']) * 100
-
-                    tabla_pivot = resumen_grupo.pivot(index='grupo_equipo', columns='clasificacion', values='porcentaje_productivo').fillna(0)
-                    tabla_pivot = tabla_pivot[['Bajo', 'Medio', 'Alto']]
+                    tabla_pivot = clasificacion_por_grupo(cubo, resumen)
 
-                    fig2, ax2 = plt.subplots(figsize=(6, 4))  # Aumentado tamaño
-                    tabla_pivot.plot(kind='bar', stacked=True, color=['#ef5350', '#ffa726', '#66bb6a'], ax=ax2)
-                    ax2.set_ylabel('Porcentaje Productivo (%)')
-                    ax2.set_title('Clasificación por Grupo de Equipo')
-                    st.pyplot(fig2)
+                col1, col2 = st.columns(2)
+                with medidor.tramo('clasificacion.graficos'):
+                    with col1:
+                        st.image(renderizar(dibujar_torta_clasificacion, clasif_counts, figsize=(5, 3)), use_container_width=True)
+                    with col2:
+                        st.image(renderizar(dibujar_clasificacion_por_grupo, tabla_pivot, figsize=(6, 4)), use_container_width=True)
 
                 resumen_sorted = resumen.sort_values(by='porcentaje_productivo', ascending=False)
                 st.dataframe(resumen_sorted[['Equipo', 'porcentaje_productivo', 'clasificacion']], use_container_width=True)
@@ -243,168 +380,59 @@ if archivo_cargado:
     elif pestaña == "🚨 Alertas equipos parados o en mantenimiento":
         st.header("🚨 Equipos con Alta Inactividad")
 
-        tiempo_total = df_filtrado_global.groupby('Equipo')['tiempo_seg'].sum()
-        mant = df_filtrado_global[df_filtrado_global['Grupo Operacion'] == 'MANTENIMIENTO'].groupby('Equipo')['tiempo_seg'].sum()
-        parado = df_filtrado_global[~df_filtrado_global['Grupo Operacion'].isin(['PRODUCTIVO', 'MANTENIMIENTO'])].groupby('Equipo')['tiempo_seg'].sum()
-
-        resumen = pd.DataFrame({
-            'tiempo_total_horas': tiempo_total / 3600,
-            'tiempo_mantenimiento_horas': mant / 3600,
-            'tiempo_parado_horas': parado / 3600
-        }).fillna(0)
+        ventanas = {"Todo el archivo": None, "Última hora": 1, "Últimas 2 horas": 2, "Últimas 4 horas": 4, "Últimas 8 horas": 8}
+        ventana = st.selectbox("Ventana de evaluación", options=list(ventanas))
+        horas_ventana = ventanas[ventana]
 
-        resumen['% mantenimiento'] = resumen['tiempo_mantenimiento_horas'] / resumen['tiempo_total_horas'] * 100
-        resumen['% parado'] = resumen['tiempo_parado_horas'] / resumen['tiempo_total_horas'] * 100
-        resumen['% alerta total'] = resumen['% mantenimiento'] + resumen['% parado']
-        resumen['comentario'] = resumen.apply(lambda r: '🛠 100% mantenimiento' if r['% mantenimiento'] == 100 else ('🟥 100% parado' if r['% parado'] == 100 else '🚨 Inactivo >80%' if r['% alerta total'] >= 80 else '🔔 Alta inactividad'), axis=1)
-
-        alertas = resumen[resumen['% alerta total'] > 60]
-        comentarios = alertas[alertas['comentario'] != '']
+        # Las reglas se evalúan una sola vez; la página y el PDF comparten el resultado
+        with medidor.tramo('alertas') as tramo:
+            if horas_ventana is None:
+                alertas = evaluar_alertas(resumen_inactividad(cubo))
+            else:
+                por_ventana = inactividad_por_ventana(cubo, horas_ventana)
+                alertas = evaluar_alertas(por_ventana[por_ventana['Hora'] == por_ventana['Hora'].max()].set_index('Equipo').drop(columns='Hora'))
+            agrupado = agrupar_alertas(alertas)
+            tramo.filas = len(alertas)
 
-        if not comentarios.empty:
+        if not agrupado.empty:
             st.subheader("🔔 Equipos con Inactividad Total o Crítica")
-            agrupado = alertas.groupby('comentario').apply(lambda df: ', '.join(df.index.astype(str))).reset_index(name='equipos')
-            for _, fila in agrupado.iterrows():
-                st.markdown(f"- **Equipos {fila['equipos']}**: {fila['comentario']}")
+            for fila in agrupado.itertuples(index=False):
+                st.markdown(f"- **Equipos {fila.equipos}**: {fila.comentario}")
         else:
             st.info("No se detectaron equipos con inactividad crítica.")
 
         st.dataframe(alertas, use_container_width=True)
 
+        if horas_ventana is not None:
+            with st.expander("🕒 Equipos en alerta por hora"):
+                with medidor.tramo('alertas.por_hora'):
+                    alertas_hora = evaluar_alertas(por_ventana)
+                st.dataframe(pd.crosstab(alertas_hora['Hora'], alertas_hora['comentario']), use_container_width=True)
+
         # =====================================================
         # 📄 GENERADOR DE REPORTE EN PDF - VERSIÓN STREAMLIT CLOUD
         # =====================================================
 
-        import io
-        from fpdf import FPDF
         from datetime import datetime
 
-        # Función para generar el gráfico de último estado (reutiliza tu lógica actual)
-        def generar_grafico_ultimo_estado_para_pdf():
-            hora_opciones = sorted(df_filtrado_global['Hora'].dt.time.unique())
-            if not hora_opciones:
-                return None
-
-            hora_str = hora_opciones[-1]
-            fecha = df_filtrado_global['Fecha/Hora'].min().date()
-            hora_obj = pd.Timestamp.combine(fecha, hora_str.replace(minute=0, second=0, microsecond=0))
-
-            df_hora = df_filtrado_global[df_filtrado_global['Hora'] == hora_obj]
-            if df_hora.empty:
-                return None
-
-            ultimo_registro = df_hora.sort_values(['Equipo', 'Fecha/Hora']).groupby('Equipo').tail(1)
-            resumen = ultimo_registro.groupby(['Grupo Operacion'])['Equipo'].nunique().reset_index(name='Cantidad')
-            colores_personalizados = {
-                'MANTENIMIENTO': 'blue',
-                'PERDIDA': 'red',
-                'PRODUCTIVO': 'green',
-                'NAO CADASTRADO': 'grey'
-            }
-
-            fig, ax = plt.subplots(figsize=(8, 4))
-            sns.barplot(data=resumen, x='Grupo Operacion', y='Cantidad', palette=colores_personalizados, ax=ax)
-            ax.set_title(f"Equipos por Estado Operativo (a las {hora_str} del {fecha.strftime('%d/%m/%Y')})")
-            ax.set_ylim(0, resumen['Cantidad'].max() * 1.2)
-            for container in ax.containers:
-                ax.bar_label(container, label_type='edge', padding=3)
-
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
-            return buf
-
-        # Función para generar el PDF (versión FINAL PULIDA - Streamlit Cloud)
-        def generar_pdf_reporte(grafico_buf, alertas_df, comentarios_agrupados, grupos_seleccionados):
-            pdf = FPDF()
-            pdf.add_page()
-
-            pdf.set_font("Arial", "B", 16)
-            pdf.cell(0, 10, "REPORTE DE ALERTAS OPERATIVAS", ln=True, align='C')
-            pdf.ln(5)
-
-            pdf.set_font("Arial", "", 10)
-            fecha_gen = datetime.now().strftime("%d/%m/%Y")
-            pdf.cell(0, 8, f"Fecha de generación: {fecha_gen}", ln=True)
-            pdf.cell(0, 8, f"Grupos incluidos: {', '.join(grupos_seleccionados)}", ln=True)
-            pdf.ln(10)
-
-            if grafico_buf:
-                temp_img = "temp_grafico_reporte.png"
-                with open(temp_img, "wb") as f:
-                    f.write(grafico_buf.read())
-                pdf.image(temp_img, x=15, w=180)
-                pdf.ln(10)
-                import os
-                os.remove(temp_img)
-
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 10, "RESUMEN DE COMENTARIOS AGRUPADOS", ln=True)
-            pdf.ln(3)
-
-            pdf.set_font("Arial", "", 10)
-            if not comentarios_agrupados.empty:
-                for _, fila in comentarios_agrupados.iterrows():
-                    comentario_limpio = fila['comentario']
-                    comentario_limpio = comentario_limpio.replace('🛠', '').replace('[MANTENIMIENTO]', '').strip()
-                    comentario_limpio = comentario_limpio.replace('🟥', '').replace('[PARADO]', '').strip()
-                    comentario_limpio = comentario_limpio.replace('🚨', '').replace('[INACTIVO >80%]', '').strip()
-                    comentario_limpio = comentario_limpio.replace('🔔', '').replace('[ALTA INACTIVIDAD]', '').strip()
-                    comentario_limpio = ' '.join(comentario_limpio.split())
-                    pdf.cell(0, 8, f"- Equipos {fila['equipos']}: {comentario_limpio}", ln=True)
-            else:
-                pdf.cell(0, 8, "No hay equipos con inactividad crítica.", ln=True)
-
-            pdf.ln(10)
-
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 10, "TABLA DETALLADA DE ALERTAS", ln=True)
-            pdf.ln(3)
-
-            pdf.set_font("Arial", "B", 10)
-            pdf.set_fill_color(200, 220, 255)
-            pdf.cell(30, 10, "Equipo", 1, 0, 'C', 1)
-            pdf.cell(50, 10, "% Alerta Total", 1, 0, 'C', 1)
-            pdf.cell(0, 10, "Comentario", 1, 1, 'C', 1)
-
-            pdf.set_font("Arial", "", 10)
-            for _, row in alertas_df.iterrows():
-                comentario_limpio = row['comentario']
-                comentario_limpio = comentario_limpio.replace('🛠', '').replace('[MANTENIMIENTO]', '').strip()
-                comentario_limpio = comentario_limpio.replace('🟥', '').replace('[PARADO]', '').strip()
-                comentario_limpio = comentario_limpio.replace('🚨', '').replace('[INACTIVO >80%]', '').strip()
-                comentario_limpio = comentario_limpio.replace('🔔', '').replace('[ALTA INACTIVIDAD]', '').strip()
-                comentario_limpio = ' '.join(comentario_limpio.split())
-                pdf.cell(30, 10, str(row.name), 1)
-                pdf.cell(50, 10, f"{row['% alerta total']:.1f}%", 1)
-                pdf.cell(0, 10, comentario_limpio, 1, 1)
-
-            pdf.ln(15)
-
-            pdf.set_font("Arial", "I", 8)
-            pdf.cell(0, 10, "Generado automáticamente con Monitoreo de Productividad v1.0 - Powered by Santiago Correa, AP Maquinaria y equipos", 0, 1, 'C')
-
-            return bytes(pdf.output(dest='S'))
-
         # Botón para generar y descargar PDF
         if st.button("📥 Generar Reporte PDF"):
             with st.spinner("Generando reporte..."):
-                buf_grafico = generar_grafico_ultimo_estado_para_pdf()
-                alertas_para_pdf = alertas[['% alerta total', 'comentario']].copy()
-
-                if not comentarios.empty:
-                    agrupado_para_pdf = alertas.groupby('comentario').apply(lambda df: ', '.join(df.index.astype(str))).reset_index(name='equipos')
-                else:
-                    agrupado_para_pdf = pd.DataFrame({'comentario': [], 'equipos': []})
+                with medidor.tramo('indice_estados', filas=filas_cargadas):
+                    indice_estados = cargar_indice_estados(archivo_cargado, fuente)
+                with medidor.tramo('pdf.grafico'):
+                    buf_grafico = generar_grafico_ultimo_estado_para_pdf(cubo, indice_estados, grupos_seleccionados)
+                alertas_para_pdf = alertas[['% alerta total', 'comentario']]
+                agrupado_para_pdf = agrupado
 
                 try:
-                    pdf_bytes = generar_pdf_reporte(
-                        buf_grafico,
-                        alertas_para_pdf,
-                        agrupado_para_pdf,
-                        grupos_seleccionados
-                    )
+                    with medidor.tramo('pdf.documento'):
+                        pdf_bytes = generar_pdf_reporte(
+                            buf_grafico,
+                            alertas_para_pdf,
+                            agrupado_para_pdf,
+                            grupos_seleccionados
+                        )
 
                     st.success("✅ ¡Reporte generado con éxito!")
 
@@ -420,91 +448,161 @@ if archivo_cargado:
     elif pestaña == "📍 Recorrido y Hora Inicio Labor":
         st.header("📍 Visualización de Recorridos y Hora de Inicio de Labores")
 
+        # Solo esta vista lee las columnas de GPS (ya numéricas desde la carga)
+        with medidor.tramo('particion_gps'):
+            particion_gps = cargar_particion_gps(archivo_cargado, fuente)
+
         columnas_requeridas = ['Latitud', 'Longitud', 'Velocidad']
-        faltantes = [col for col in columnas_requeridas if col not in df_filtrado_global.columns]
+        faltantes = [col for col in columnas_requeridas if col not in particion_gps.df.columns]
 
         if faltantes:
             st.error(f"❌ Faltan columnas requeridas en el archivo: {', '.join(faltantes)}")
             st.stop()
 
-        for col in columnas_requeridas:
-            df_filtrado_global[col] = pd.to_numeric(df_filtrado_global[col], errors='coerce')
+        # Vista de solo lectura de los grupos seleccionados (memorizada por selección)
+        with medidor.tramo('particion_gps.vista') as tramo:
+            df_filtrado_global = cargar_vista_gps(archivo_cargado, tuple(grupos_seleccionados), fuente)
+            tramo.filas = len(df_filtrado_global)
+
+        metodo_distancia = st.radio("📏 Método de cálculo de distancia", options=list(METODOS_DISTANCIA), horizontal=True)
 
-        df_filtrado_global = df_filtrado_global.dropna(subset=['Latitud', 'Longitud'])
+        # Distancia recorrida en labor (velocidad > 7 km/h) para toda la flota en una sola pasada
+        with medidor.tramo(f'distancia_labor.{metodo_distancia}'):
+            distancias_labor = distancia_por_equipo(
+                df_filtrado_global[df_filtrado_global['Velocidad'] > VELOCIDAD_LABOR],
+                metodo=metodo_distancia
+            )
 
         st.subheader("📋 Resumen de Inicio de Labores por Grupo Equipo / Frente")
 
-        def obtener_hora_inicio_grupo(equipo_df):
-            datos_labor = equipo_df[equipo_df['Velocidad'] > 7]
-            if not datos_labor.empty:
-                return datos_labor['Fecha/Hora'].iloc[0]
-            else:
-                return "Equipo sin inicio de labor"
-
-        inicio_por_equipo = []
-        for grupo, grupo_df in df_filtrado_global.groupby('grupo_equipo'):
-            for equipo in grupo_df['Equipo'].unique():
-                equipo_df = df_filtrado_global[df_filtrado_global['Equipo'] == equipo]
-                hora_inicio = obtener_hora_inicio_grupo(equipo_df)
-                inicio_por_equipo.append({
-                    'Grupo Equipo/Frente': grupo,
-                    'Equipo': equipo,
-                    'Hora Inicio': hora_inicio
-                })
-
-        inicio_por_equipo_df = pd.DataFrame(inicio_por_equipo)
+        # Inicio/fin de labor de toda la flota en una sola pasada; el mapa reutiliza este resultado
+        with medidor.tramo('inicio_labor'):
+            labor_por_equipo = resumen_labor(df_filtrado_global)
+
+        inicio_por_equipo_df = pd.DataFrame({
+            'Grupo Equipo/Frente': labor_por_equipo['grupo_equipo'],
+            'Equipo': labor_por_equipo['Equipo'],
+            'Hora Inicio': labor_por_equipo['inicio'].astype(object).where(labor_por_equipo['inicio'].notna(), "Equipo sin inicio de labor"),
+            'Hora Fin': labor_por_equipo['fin'],
+            'Duración': labor_por_equipo['duracion'],
+            'Distancia Labor (km)': (labor_por_equipo['Equipo'].map(distancias_labor).fillna(0) / 1000).round(2)
+        })
         st.dataframe(inicio_por_equipo_df, use_container_width=True)
 
-        equipos_disponibles = df_filtrado_global['Equipo'].unique()
+        st.subheader("🛑 Eventos de Parada por Equipo")
+        duracion_min = st.number_input("Duración mínima de parada (minutos)", min_value=1, max_value=240, value=2)
+        with medidor.tramo('paradas') as tramo:
+            paradas = cargar_paradas(archivo_cargado, duracion_min * 60, fuente)
+            paradas = paradas[paradas['grupo_equipo'].isin(grupos_seleccionados)]
+            tramo.filas = len(paradas)
+        st.caption(f"{len(paradas):,} eventos · {paradas['duracion_seg'].sum() / 3600:.1f} h detenidos")
+        st.dataframe(
+            paradas[['Equipo', 'grupo_equipo', 'estado', 'inicio', 'fin', 'duracion', 'lat', 'lon']].rename(columns={
+                'grupo_equipo': 'Grupo Equipo/Frente', 'estado': 'Estado', 'inicio': 'Inicio', 'fin': 'Fin',
+                'duracion': 'Duración', 'lat': 'Latitud', 'lon': 'Longitud'
+            }),
+            use_container_width=True
+        )
+
+        st.subheader("🌡️ Tiempo por Zona de Toda la Flota")
+        col_estados, col_celda = st.columns([3, 1])
+        with col_estados:
+            opciones_estado = sorted(df_filtrado_global['Grupo Operacion'].dropna().unique())
+            estados_mapa = st.multiselect(
+                "Estados a ubicar", options=opciones_estado,
+                default=[e for e in ['PERDIDA', 'MANTENIMIENTO'] if e in opciones_estado]
+            )
+        with col_celda:
+            tamano_celda = st.number_input("Tamaño de celda (m)", min_value=10, max_value=5000, value=TAMANO_CELDA_M, step=10)
+
+        with medidor.tramo('mapa_calor.malla') as tramo:
+            celdas = cargar_celdas(archivo_cargado, tuple(grupos_seleccionados), tuple(estados_mapa), tamano_celda, fuente)
+            # Un punto por celda (suma de los estados elegidos), con peso relativo a la celda más cargada
+            por_celda = celdas.groupby(['lat', 'lon'])['tiempo_seg'].sum().reset_index()
+            tramo.filas = len(por_celda)
+
+        if por_celda.empty:
+            st.info("No hay tiempo registrado en esos estados para los grupos seleccionados.")
+        else:
+            mapa_calor = folium.Map(location=[float(por_celda['lat'].mean()), float(por_celda['lon'].mean())], zoom_start=12)
+            pesos = por_celda['tiempo_seg'] / por_celda['tiempo_seg'].max()
+            HeatMap(np.round(np.column_stack([por_celda['lat'], por_celda['lon'], pesos]), 6).tolist(), radius=15, blur=10).add_to(mapa_calor)
+            st.caption(
+                f"🧮 {len(por_celda):,} celdas de {tamano_celda} m enviadas al mapa · "
+                f"{por_celda['tiempo_seg'].sum() / 3600:.1f} h en {', '.join(estados_mapa)}"
+            )
+            with medidor.tramo('mapa_calor.st_folium'):
+                st_folium(mapa_calor, key='mapa_calor', width="100%", height=450, returned_objects=[])
+
+        equipos_disponibles = sorted(df_filtrado_global['Equipo'].unique())
         if len(equipos_disponibles) == 0:
             st.warning("No hay equipos disponibles con datos geográficos.")
         else:
             equipo_seleccionado = st.selectbox("Selecciona un equipo para ver su recorrido", equipos_disponibles)
 
-            datos_equipo = df_filtrado_global[df_filtrado_global['Equipo'] == equipo_seleccionado].sort_values(by='Fecha/Hora')
+            with medidor.tramo('recorrido.filtro_equipo') as tramo:
+                datos_equipo = df_filtrado_global[df_filtrado_global['Equipo'] == equipo_seleccionado].sort_values(by='Fecha/Hora')
+                tramo.filas = len(datos_equipo)
 
             if datos_equipo.empty:
                 st.error("No hay datos para este equipo.")
             else:
-                centro = [datos_equipo['Latitud'].mean(), datos_equipo['Longitud'].mean()]
+                with st.expander("⚙️ Simplificación del recorrido"):
+                    col_tol, col_int, col_max = st.columns(3)
+                    with col_tol:
+                        tolerancia_m = st.number_input("Tolerancia Douglas-Peucker (m)", min_value=0.0, max_value=500.0, value=5.0, step=1.0)
+                    with col_int:
+                        intervalo_s = st.number_input("Un punto cada (s)", min_value=0, max_value=3600, value=0, step=10)
+                    with col_max:
+                        max_vertices = st.number_input(
+                            "Máximo de vértices", min_value=100, max_value=50000, value=5000, step=500,
+                            help="Los cambios de estado se dibujan siempre, aunque superen este máximo"
+                        )
+
+                centro = [float(datos_equipo['Latitud'].mean()), float(datos_equipo['Longitud'].mean())]
                 mapa = folium.Map(location=centro, zoom_start=13)
 
-                puntos_linea = [[row['Latitud'], row['Longitud']] for _, row in datos_equipo.iterrows()]
+                # Solo se envían al navegador los vértices simplificados (se conservan los cambios de estado)
+                with medidor.tramo('recorrido.simplificacion') as tramo:
+                    mascara_ruta = simplificar_recorrido(datos_equipo, tolerancia_m, intervalo_s, max_vertices)
+                    coordenadas = datos_equipo[['Latitud', 'Longitud']].to_numpy('float64')
+                    puntos_linea = np.round(coordenadas[mascara_ruta], 6).tolist()
+                    tramo.filas = len(puntos_linea)
+                st.caption(
+                    f"🛰️ Fijaciones GPS: {len(datos_equipo):,} originales · {len(puntos_linea):,} dibujadas"
+                    + (" (los cambios de estado superan el máximo de vértices)" if len(puntos_linea) > max_vertices else "")
+                )
                 if len(puntos_linea) >= 2:
                     AntPath(locations=puntos_linea, color='green', weight=4, delay=800).add_to(mapa)
                 else:
                     st.warning("No hay suficientes puntos para trazar la ruta.")
 
                 cluster = MarkerCluster().add_to(mapa)
-                paradas = []
-
-                for _, row in datos_equipo.iterrows():
-                    estado = str(row['Grupo Operacion']).strip().upper()
-                    if estado in ['PERDIDA', 'MANTENIMIENTO']:
-                        paradas.append([row['Latitud'], row['Longitud']])
-
-                if paradas:
-                    Marker(
-                        location=[datos_equipo['Latitud'].mean(), datos_equipo['Longitud'].mean()],
-                        popup=f"Total de Paradas: {len(paradas)}",
-                        icon=Icon(color='red', icon='cloud', prefix='fa')
-                    ).add_to(cluster)
-
-                datos_labor = datos_equipo[datos_equipo['Velocidad'] > 7]
-                if not datos_labor.empty:
-                    inicio = datos_labor['Fecha/Hora'].iloc[0]
-                    fin = datos_labor['Fecha/Hora'].iloc[-1]
+                colores_parada = {'MANTENIMIENTO': 'blue', 'PERDIDA': 'red'}
+
+                with medidor.tramo('recorrido.marcadores_parada'):
+                    for evento in paradas[paradas['Equipo'] == equipo_seleccionado].dropna(subset=['lat', 'lon']).itertuples(index=False):
+                        Marker(
+                            location=[evento.lat, evento.lon],
+                            popup=f"{evento.estado}: {evento.inicio.strftime('%H:%M')} - {evento.fin.strftime('%H:%M')} ({evento.duracion})",
+                            icon=Icon(color=colores_parada.get(str(evento.estado).strip().upper(), 'orange'), icon='cloud', prefix='fa')
+                        ).add_to(cluster)
+
+                labor_equipo = labor_por_equipo[labor_por_equipo['Equipo'] == equipo_seleccionado].dropna(subset=['inicio'])
+                if not labor_equipo.empty:
+                    primera = labor_equipo.loc[labor_equipo['inicio'].idxmin()]
+                    ultima = labor_equipo.loc[labor_equipo['fin'].idxmax()]
+                    inicio = primera['inicio']
+                    fin = ultima['fin']
                     duracion = fin - inicio
-
-                    puntos_labor = list(zip(datos_labor['Latitud'], datos_labor['Longitud']))
-                    distancia = sum(geodesic(p1, p2).meters for p1, p2 in zip(puntos_labor[:-1], puntos_labor[1:]))
+                    distancia = distancias_labor.get(equipo_seleccionado, 0.0)
 
                     Marker(
-                        location=[datos_labor['Latitud'].iloc[0], datos_labor['Longitud'].iloc[0]],
+                        location=[primera['lat_inicio'], primera['lon_inicio']],
                         icon=Icon(color='green', icon='play')
                     ).add_to(mapa)
                     Marker(
-                        location=[datos_labor['Latitud'].iloc[-1], datos_labor['Longitud'].iloc[-1]],
+                        location=[ultima['lat_fin'], ultima['lon_fin']],
                         icon=Icon(color='red', icon='stop')
                     ).add_to(mapa)
 
@@ -517,10 +615,37 @@ if archivo_cargado:
                     st.warning("No se encontró velocidad > 7 km/h para este equipo. No se pueden calcular inicio/fin de labores.")
 
                 # 🗺️ MAPA RESPONSIVO
-                st_folium(mapa, width="100%", height=600)
+                with medidor.tramo('recorrido.st_folium'):
+                    st_folium(mapa, width="100%", height=600)
 
 else:
     st.info("⬅️ Por favor, cargue un archivo para comenzar.")
+
+# ================================
+# 🔬 PANEL DE RENDIMIENTO
+# ================================
+st.sidebar.divider()
+mostrar_rendimiento = st.sidebar.toggle("🔬 Rendimiento", key='panel_rendimiento')
+st.sidebar.checkbox(f"📝 Guardar tramos en {ARCHIVO_REGISTRO}", key='registro_rendimiento')
+if mostrar_rendimiento and medidor.tramos:
+    st.sidebar.caption(f"Ejecución {medidor.corrida}: {medidor.total_segundos * 1000:.0f} ms en total")
+    st.sidebar.dataframe(medidor.tabla(), hide_index=True, use_container_width=True)
+if mostrar_rendimiento:
+    # Estado de las cachés compartidas por todas las sesiones del servidor
+    datos = estadisticas_cache_datos()
+    st.sidebar.caption(
+        f"🗄️ Caché de datos: {datos['entradas']} entradas · {datos['bytes'] / 1024 ** 2:,.0f} de "
+        f"{datos['presupuesto'] / 1024 ** 2:,.0f} MB · {datos['aciertos']} aciertos · {datos['fallos']} fallos · "
+        f"{datos['desalojos']} desalojos · {datos['rechazos']} rechazos"
+    )
+    graficos = estadisticas_cache_graficos()
+    st.sidebar.caption(
+        f"🖼️ Caché de gráficos: {graficos['entradas']} entradas · {graficos['bytes'] / 1024 ** 2:,.1f} MB · "
+        f"{graficos['aciertos']} aciertos · {graficos['fallos']} fallos · {graficos['desalojos']} desalojos"
+    )
+    with st.sidebar.expander("🗄️ Entradas de la caché de datos"):
+        st.dataframe(detalle_cache().round({'MB': 1}), hide_index=True, use_container_width=True)
+medidor.cerrar()
 #python -m streamlit run c:/Users/sacor/Downloads/resumen_monitoreo3.py
 
 
@@ -0,0 +1,283 @@
+"""Servicio HTTP local con los agregados del tablero, sin Streamlit.
+
+    python servicio_agregados.py exportes/ --puerto 8765
+
+Carga la telemetría una sola vez (caché Parquet de procesamiento.cargar_telemetria),
+construye el cubo y el índice de estados y responde en JSON o Arrow IPC:
+
+    GET /productividad       % productivo y clasificación por Equipo
+    GET /evolucion_horaria   % productivo por Hora
+    GET /ultimo_estado       cantidad de equipos por Grupo Operacion en un instante
+    GET /alertas             equipos en alerta con su comentario
+    GET /estado              filas, grupos, rango de fechas y estadísticas de la caché
+
+Parámetros comunes: grupo (repetible), desde, hasta y formato=json|arrow.
+El rango se aplica por horas completas del cubo (desde y hasta se llevan a la
+hora); las fechas con zona horaria (2024-03-05T08:00Z) se pasan a la hora
+local del servidor, la de los exportes. /ultimo_estado evalúa en `momento`
+(por defecto `hasta` o el último registro) con los registros de los últimos
+`ventana_min` minutos; /alertas acepta `ventana_horas` como la vista de
+alertas. Las respuestas quedan en la caché de datos compartida (cache_datos),
+con la huella del archivo en la clave.
+
+Con --particiones DIR el cubo no se arma en memoria: cada respuesta suma el
+tiempo con un motor de motor_consultas (DuckDB o pyarrow) sobre el directorio
+Parquet por día, que se escribe desde las entradas si está vacío. En memoria
+queda solo el índice de estados (cuatro columnas) para /ultimo_estado.
+
+    python servicio_agregados.py exportes/ --particiones particiones/ --motor duckdb
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+
+from cache_datos import obtener, estadisticas_cache
+from motor_consultas import MOTORES, crear_motor, escribir_particiones, leer_particiones
+from procesamiento import (
+    CLAVES_CUBO, COLUMNAS_BASE, DIRECTORIO_CACHE, IndiceUltimoEstado, cargar_telemetria, construir_cubo,
+    filtrar_cubo, huella_archivo, huella_archivos, listar_archivos, productividad_por_equipo, evolucion_horaria,
+    resumen_inactividad, inactividad_por_ventana, evaluar_alertas
+)
+
+FORMATOS = {'json': 'application/json; charset=utf-8', 'arrow': 'application/vnd.apache.arrow.stream'}
+# Columnas que necesita IndiceUltimoEstado (lo único que se carga en memoria con particiones)
+COLUMNAS_INDICE = ['Fecha/Hora', 'Equipo', 'Grupo Operacion', 'grupo_equipo']
+
+
+class ParametroInvalido(ValueError):
+    """Parámetro de consulta con un valor que no se puede interpretar (se responde 400)."""
+
+
+# ===============================
+# 📊 CONSULTAS
+# ===============================
+def _momento(parametros, nombre):
+    valor = parametros.get(nombre)
+    if valor is None:
+        return None
+    try:
+        momento = pd.Timestamp(valor)
+    except ValueError:
+        raise ParametroInvalido(f"{nombre} no es una fecha válida: {valor}")
+    if momento.tzinfo is not None:
+        # Los exportes traen hora local sin zona: una fecha con zona se pasa a la hora local del servidor
+        momento = pd.Timestamp(datetime.fromtimestamp(momento.timestamp()))
+    return momento
+
+
+def _entero(parametros, nombre, defecto=None):
+    valor = parametros.get(nombre)
+    if valor is None:
+        return defecto
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ParametroInvalido(f"{nombre} debe ser un entero: {valor}")
+    if valor < 1:
+        raise ParametroInvalido(f"{nombre} debe ser mayor que cero: {valor}")
+    return valor
+
+
+def _productividad(servicio, cubo, parametros):
+    return productividad_por_equipo(cubo)
+
+
+def _evolucion_horaria(servicio, cubo, parametros):
+    return evolucion_horaria(cubo)
+
+
+def _ultimo_estado(servicio, cubo, parametros):
+    momento = next((m for m in (parametros['momento'], parametros['hasta']) if m is not None), servicio.indice.rango[1])
+    return servicio.indice.conteo_en(momento, ventana=pd.Timedelta(minutes=parametros['ventana_min']), grupos=parametros['grupo'])
+
+
+def _alertas(servicio, cubo, parametros):
+    horas_ventana = parametros['ventana_horas']
+    if horas_ventana is None:
+        return evaluar_alertas(resumen_inactividad(cubo)).reset_index()
+    por_ventana = inactividad_por_ventana(cubo, horas_ventana)
+    return evaluar_alertas(por_ventana[por_ventana['Hora'] == por_ventana['Hora'].max()]).reset_index(drop=True)
+
+
+CONSULTAS = {
+    'productividad': _productividad,
+    'evolucion_horaria': _evolucion_horaria,
+    'ultimo_estado': _ultimo_estado,
+    'alertas': _alertas,
+}
+# Responden solo con el índice de estados: para ellas no se filtra ni se suma el cubo
+SIN_CUBO = {'ultimo_estado'}
+
+
+def serializar(df, formato):
+    """Frame en bytes JSON (lista de registros, fechas ISO) o Arrow IPC (stream)."""
+    if formato == 'arrow':
+        sumidero = pa.BufferOutputStream()
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_stream(sumidero, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return sumidero.getvalue().to_pybytes()
+    return df.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+
+
+class ServicioAgregados:
+    """Telemetría cargada una vez (cubo + índice de estados) y respuestas por consulta cacheadas.
+
+    Con `particiones` el cubo de cada respuesta lo suma el motor `motor` sobre
+    ese directorio (ver motor_consultas.crear_motor); si el directorio ya tiene
+    particiones se usan tal cual, así que deben venir de los mismos archivos.
+    """
+
+    def __init__(self, archivos, directorio_cache=DIRECTORIO_CACHE, particiones=None, motor='auto', hilos=None):
+        inicio = time.perf_counter()
+        self.archivos = archivos
+        self.huella = huella_archivos(archivos) if len(archivos) > 1 else huella_archivo(archivos[0])
+        if particiones is None:
+            df = cargar_telemetria(archivos, columnas=COLUMNAS_BASE, directorio_cache=directorio_cache)
+            self.cubo, self.motor = construir_cubo(df), None
+        else:
+            if not (os.path.isdir(particiones) and os.listdir(particiones)):
+                escribir_particiones(archivos, particiones)
+            df = leer_particiones(particiones, columnas=COLUMNAS_INDICE)
+            self.cubo, self.motor = None, crear_motor(particiones, motor, hilos)
+        self.filas = len(df)
+        self.indice = IndiceUltimoEstado(df)
+        self.grupos = sorted(df['grupo_equipo'].dropna().unique())
+        self.segundos_carga = time.perf_counter() - inicio
+
+    def cubo_filtrado(self, grupos=None, desde=None, hasta=None):
+        """Cubo de los grupos y el rango (horas completas): filtrado en memoria o sumado por el motor."""
+        if self.motor is None:
+            return filtrar_cubo(self.cubo, grupos, desde, hasta)
+        return self.motor.sumar_tiempo(CLAVES_CUBO, grupos, desde, hasta)
+
+    def parametros(self, consulta):
+        """Normaliza el query string: grupos ordenados, fechas como Timestamp y enteros validados."""
+        parametros = {nombre: valores[-1] for nombre, valores in consulta.items()}
+        formato = parametros.pop('formato', 'json')
+        if formato not in FORMATOS:
+            raise ParametroInvalido(f"formato desconocido: {formato} (opciones: {', '.join(FORMATOS)})")
+        grupos = consulta.get('grupo')
+        return formato, {
+            'grupo': tuple(sorted(set(grupos))) if grupos else None,
+            'desde': _momento(parametros, 'desde'),
+            'hasta': _momento(parametros, 'hasta'),
+            'momento': _momento(parametros, 'momento'),
+            'ventana_min': _entero(parametros, 'ventana_min', 60),
+            'ventana_horas': _entero(parametros, 'ventana_horas'),
+        }
+
+    def responder(self, nombre, consulta):
+        """(tipo de contenido, cuerpo) de la consulta `nombre` ('estado' o una de CONSULTAS)."""
+        if nombre == 'estado':
+            return FORMATOS['json'], json.dumps(self.estado(), ensure_ascii=False, default=str).encode('utf-8')
+        calcular = CONSULTAS[nombre]
+        formato, parametros = self.parametros(consulta)
+        clave = ('respuesta', self.huella, nombre, formato, tuple(parametros.items()))
+
+        def calcular_cuerpo():
+            cubo = None if nombre in SIN_CUBO else self.cubo_filtrado(parametros['grupo'], parametros['desde'], parametros['hasta'])
+            return serializar(calcular(self, cubo, parametros), formato)
+
+        cuerpo = obtener(clave, calcular_cuerpo)
+        return FORMATOS[formato], cuerpo
+
+    def estado(self):
+        primero, ultimo = self.indice.rango
+        return {
+            'archivos': [os.path.basename(a) for a in self.archivos],
+            'filas': self.filas,
+            'grupos': self.grupos,
+            'desde': primero.isoformat(),
+            'hasta': ultimo.isoformat(),
+            'segundos_carga': round(self.segundos_carga, 3),
+            'motor': self.motor.nombre if self.motor is not None else 'memoria',
+            'consultas': sorted(CONSULTAS),
+            'cache': estadisticas_cache(),
+        }
+
+
+# ===============================
+# 🌐 SERVIDOR HTTP
+# ===============================
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        nombre = url.path.strip('/') or 'estado'
+        if nombre != 'estado' and nombre not in CONSULTAS:
+            self._error(404, f"consulta desconocida: /{nombre} (opciones: estado, {', '.join(CONSULTAS)})")
+            return
+        try:
+            tipo, cuerpo = self.server.servicio.responder(nombre, parse_qs(url.query))
+            self._enviar(200, tipo, cuerpo)
+        except ParametroInvalido as e:
+            self._error(400, str(e))
+        except Exception as e:
+            self._error(500, f"{type(e).__name__}: {e}")
+
+    def _enviar(self, codigo, tipo, cuerpo):
+        self.send_response(codigo)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _error(self, codigo, mensaje):
+        self._enviar(codigo, FORMATOS['json'], json.dumps({'error': mensaje}, ensure_ascii=False).encode('utf-8'))
+
+    def log_message(self, formato, *args):
+        if self.server.registrar:
+            super().log_message(formato, *args)
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    # La cola por defecto (5) rechaza ráfagas de clientes concurrentes y el reintento de conexión demora ~1 s
+    request_queue_size = 128
+
+
+def crear_servidor(servicio, host='127.0.0.1', puerto=8765, registrar=True):
+    """Servidor con un hilo por conexión; puerto=0 elige uno libre (ver servidor.server_address)."""
+    servidor = _Servidor((host, puerto), _Manejador)
+    servidor.servicio = servicio
+    servidor.registrar = registrar
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sirve los agregados de productividad y alertas por HTTP (JSON o Arrow).")
+    parser.add_argument('entradas', nargs='+', help="Archivos .txt, patrones glob o directorios con exportes de telemetría (se unen)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--cache', default=DIRECTORIO_CACHE, help="Directorio de la caché Parquet de telemetría")
+    parser.add_argument('--sin-registro', action='store_true', help="No imprimir una línea por petición")
+    parser.add_argument('--particiones', help="Directorio Parquet por día para resolver las consultas fuera de memoria (se escribe si está vacío)")
+    parser.add_argument('--motor', default='auto', choices=['auto', *MOTORES], help="Motor de las particiones (auto: DuckDB si está instalado)")
+    parser.add_argument('--hilos', type=int, help="Hilos del motor (por defecto, todos los CPU)")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioAgregados(
+        listar_archivos(args.entradas), directorio_cache=args.cache, particiones=args.particiones, motor=args.motor, hilos=args.hilos
+    )
+    origen = f", motor {servicio.motor.nombre}" if servicio.motor is not None else ""
+    print(f"📁 {servicio.filas:,} registros, {len(servicio.grupos)} grupos{origen}, cargados en {servicio.segundos_carga:.1f} s")
+    servidor = crear_servidor(servicio, args.host, args.puerto, registrar=not args.sin_registro)
+    print(f"🌐 Escuchando en http://{args.host}:{servidor.server_address[1]}/ (Ctrl+C para detener)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())